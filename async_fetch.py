@@ -0,0 +1,95 @@
+# src/async_fetch.py
+import asyncio
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_PAGE_TIMEOUT = 300  # seconds per page request
+
+_END = object()
+
+
+async def _drain(
+    key: Hashable,
+    pages: Iterable[List[dict]],
+    executor: ThreadPoolExecutor,
+    semaphore: asyncio.Semaphore,
+    timeout: Optional[float],
+    ready: Optional[asyncio.Future],
+    on_page: Callable[[Hashable, List[dict]], None],
+) -> None:
+    loop = asyncio.get_running_loop()
+    iterator = iter(pages)
+    while True:
+        # Each page request is its own step under the global semaphore, so
+        # pages of every (repo, branch) pair interleave freely
+        async with semaphore:
+            page = await asyncio.wait_for(loop.run_in_executor(executor, next, iterator, _END), timeout)
+        if page is _END:
+            return
+        if ready is not None:
+            await ready
+        on_page(key, page)
+
+
+async def _run(
+    jobs: Dict[Hashable, Iterable[List[dict]]],
+    on_page: Callable[[Hashable, List[dict]], None],
+    concurrency: int,
+    timeout: Optional[float],
+    ready: Optional[Future],
+) -> Dict[Hashable, Optional[BaseException]]:
+    # Not the loop's default executor: asyncio.run joins that one on exit,
+    # which would wait for page requests that already timed out
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="fetch")
+    semaphore = asyncio.Semaphore(concurrency)
+    ready_future = asyncio.wrap_future(ready) if ready is not None else None
+    tasks = {
+        key: asyncio.create_task(_drain(key, pages, executor, semaphore, timeout, ready_future, on_page), name=str(key))
+        for key, pages in jobs.items()
+    }
+    try:
+        outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    except asyncio.CancelledError:
+        for task in tasks.values():
+            task.cancel()
+        raise
+    finally:
+        # Don't block on page requests that timed out; their threads finish in the background
+        executor.shutdown(wait=False)
+    errors = {}
+    for key, outcome in zip(tasks, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            errors[key] = TimeoutError(f"Page request for {key} timed out after {timeout}s")
+        elif isinstance(outcome, BaseException):
+            errors[key] = outcome
+        else:
+            errors[key] = None
+    return errors
+
+
+def fetch_all(
+    jobs: Dict[Hashable, Iterable[List[dict]]],
+    on_page: Callable[[Hashable, List[dict]], None],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: Optional[float] = DEFAULT_PAGE_TIMEOUT,
+    ready: Optional[Future] = None,
+) -> Dict[Hashable, Optional[BaseException]]:
+    """Drain every page iterator in ``jobs`` concurrently on an asyncio loop.
+
+    Each ``next()`` call (one page request) runs in a worker thread as its
+    own step under a global semaphore of size ``concurrency`` and is
+    abandoned after ``timeout`` seconds. ``on_page(key, page)`` is called on
+    the event loop thread, so it needs no locking; if ``ready`` is given,
+    pages are only delivered once that future has completed.
+
+    Returns:
+        dict: ``key -> None`` for completed iterators, or the exception that
+        stopped them.
+    """
+    if not jobs:
+        return {}
+    return asyncio.run(_run(jobs, on_page, max(int(concurrency), 1), timeout, ready))
@@ -0,0 +1,155 @@
+"""End-to-end benchmarks of the audit hot paths against a local fake server.
+
+Times ``fetch_commits``, ``load_jira_issues``, ``extract_stories`` and
+``write_excel`` at several history sizes with the Bitbucket and Jira APIs
+served by ``fake_server.FakeAtlassian``, and compares the results with the
+stored baselines.
+
+    python benchmarks/bench_pipeline.py                     # 1k, 10k, 100k
+    python benchmarks/bench_pipeline.py --sizes 1000 --latency 0.02 --throttle-every 10
+    python benchmarks/bench_pipeline.py --save-baseline     # after an intended change
+
+Baselines depend on the machine; refresh them when you switch hardware.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_server import FIX_VERSION, NEWEST_COMMIT, FakeAtlassian  # noqa: E402
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines.json"
+
+
+def write_token_file(directory: str) -> str:
+    path = os.path.join(directory, "jira_token.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "access_token": "benchmark",
+            "expires_in": 86400,
+            "token_created_at": datetime.now(timezone.utc).isoformat(),
+        }, f)
+    return path
+
+
+def run_size(server, size, args, workdir, token_file):
+    # Imported after JIRA_API_BASE is set so the client talks to the fake server
+    import http_client
+    from bitbucket_api import fetch_commits
+    from commit_processor import StoryKeyIndex, extract_stories
+    from excel_writer import write_excel
+    from jira_client import load_jira_issues
+
+    server.commits = size
+    server.issues = max(size // 10, 100)
+    http_client.close()
+    timings = {}
+
+    started = time.perf_counter()
+    commits = fetch_commits(server.bitbucket_url, "PC/pc", "develop", ("bench", "bench"),
+                            {"Accept": "application/json"}, limit=args.page_size)
+    timings["fetch_commits"] = time.perf_counter() - started
+    assert len(commits) == size, f"fetched {len(commits)} of {size} commits"
+
+    started = time.perf_counter()
+    stories = load_jira_issues(FIX_VERSION, token_file=token_file)
+    timings["load_jira_issues"] = time.perf_counter() - started
+    assert len(stories) == server.issues, f"loaded {len(stories)} of {server.issues} issues"
+
+    index = StoryKeyIndex(stories, FIX_VERSION)
+    cutoff = NEWEST_COMMIT - timedelta(days=3650)
+    freeze = NEWEST_COMMIT + timedelta(days=1)
+    rows = []
+    story_refs = {}
+    started = time.perf_counter()
+    for commit in commits:
+        rows.extend(extract_stories(
+            commit, FIX_VERSION, stories, "PolicyCenter", commit["id"], "release",
+            cutoff, freeze, "develop", story_refs, story_index=index,
+        ))
+    timings["extract_stories"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    write_excel({"PolicyCenter": rows}, [], os.path.join(workdir, f"report_{size}.xlsx"))
+    timings["write_excel"] = time.perf_counter() - started
+    return timings, len(rows)
+
+
+def compare(results, baseline, tolerance):
+    """Print the change against ``baseline``; return the regressed entries."""
+    regressions = []
+    for size, timings in results.items():
+        for name, seconds in timings.items():
+            before = baseline.get(size, {}).get(name)
+            if not before:
+                continue
+            change = seconds / before - 1
+            marker = ""
+            if change > tolerance:
+                marker = "  REGRESSION"
+                regressions.append(f"{name} @ {size}")
+            print(f"{name:>18} @ {size:>7}: {before:8.3f}s -> {seconds:8.3f}s ({change:+.0%}){marker}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Commit history sizes")
+    parser.add_argument("--page-size", type=int, default=1000, help="Bitbucket commits per page")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake server delay per response (s)")
+    parser.add_argument("--throttle-every", type=int, default=0, help="Answer every Nth request with 429")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before failing (0.25 = 25%%)")
+    args = parser.parse_args()
+    # Retry warnings for injected 429s would drown the results
+    logging.basicConfig(level=logging.ERROR)
+
+    with FakeAtlassian(throttle_every=args.throttle_every, latency=args.latency) as server, \
+            tempfile.TemporaryDirectory() as workdir:
+        os.environ["JIRA_API_BASE"] = server.jira_url
+        import http_client
+        import run_metrics
+        http_client.configure(backoff=0.01)
+        token_file = write_token_file(workdir)
+        results = {}
+        for size in args.sizes:
+            timings, rows = run_size(server, size, args, workdir, token_file)
+            results[str(size)] = {name: round(seconds, 4) for name, seconds in timings.items()}
+            print(f"{size:>7} commits, {rows} rows: " + ", ".join(
+                f"{name} {seconds:.3f}s" for name, seconds in timings.items()))
+        http = run_metrics.current().http
+        print(f"HTTP: {http['requests']} requests, {http['retries']} retries, "
+              f"{server.throttled} throttled by the fake server")
+
+    baseline = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8")).get("results", {})
+    if args.save_baseline:
+        baseline.update(results)
+        args.baseline.write_text(json.dumps({
+            "machine": f"{platform.system()} {platform.machine()} Python {platform.python_version()}",
+            "recorded": datetime.now().isoformat(timespec="seconds"),
+            "results": baseline,
+        }, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline saved to {args.baseline}")
+    elif baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Slower than baseline: " + ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Microbenchmark for commit message story-key extraction.
+
+Compares the original clean/preprocess/finditer chain with
+``commit_processor.tokenize_commit_message`` over a synthetic corpus and
+reports any messages where the two disagree.
+
+    python benchmarks/bench_story_extraction.py --count 100000
+"""
+import argparse
+import random
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from commit_processor import CONCAT_PATTERN, STORY_PATTERN, tokenize_commit_message  # noqa: E402
+
+PROJECTS = ["PCM", "BCM", "CCM", "CM", "GWCP", "pcm"]
+NOISE = ["UTF-8", "SHA-256", "JDK-17", "ISO-8601", "x86-64"]
+
+
+def legacy_tokenize(message):
+    """The pre-tokenizer pipeline, kept verbatim for comparison."""
+    message = re.sub(r'[\r\n\t]+', ' ', message)
+    message = re.sub(r'\s+', ' ', message)
+    message = message.replace("'", "").replace("\\u0027", "")
+    message = re.sub(r'[^a-zA-Z0-9\s:/_.-]', '', message)
+    cleaned = message.strip()
+    preprocessed = cleaned
+    for match in CONCAT_PATTERN.finditer(cleaned):
+        preprocessed = preprocessed.replace(match.group(0), match.group(1))
+    return cleaned, [m.group().strip().upper() for m in STORY_PATTERN.finditer(preprocessed)]
+
+
+def synthetic_message(rng: random.Random) -> str:
+    key = f"{rng.choice(PROJECTS)}-{rng.randint(1, 99999)}"
+    subject = rng.choice([
+        f"{key}: fix rating for renewal",
+        f"{key}_hotfix don't drop coverage",
+        f"Merge pull request #{rng.randint(1, 9999)} in GW/pc from feature/{key}-rating to develop",
+        f"{key}-{rng.choice(PROJECTS)}-{rng.randint(1, 999)} combined change",
+        f"[{key}] \\u0027quoted\\u0027 change (#{rng.randint(1, 999)})",
+        f"{key} set flag=\\u0027true\\u0027 (\\u0027a\\u0027) [\\u0027b\\u0027] \"\\u0027c\\u0027\" é\\u0027d",
+        f"{key} path C:\\\\u0027tmp\\\\ \\\\ escaped",
+        "Update dependencies",
+    ])
+    body = " ".join(rng.choice(NOISE + ["refactor", "tests", "docs", "*", "é"]) for _ in range(rng.randint(0, 30)))
+    return f"{subject}\r\n\r\n{body}\n\tSigned-off-by: dev <dev@example.com>"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=50000, help="Number of synthetic messages")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions (best is reported)")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [synthetic_message(rng) for _ in range(args.count)]
+
+    mismatches = [m for m in corpus if legacy_tokenize(m) != tokenize_commit_message(m)]
+    print(f"{len(corpus)} messages, {len(mismatches)} mismatches")
+    for message in mismatches[:5]:
+        print("  ", repr(message))
+
+    results = {}
+    for name, func in (("legacy", legacy_tokenize), ("tokenizer", tokenize_commit_message)):
+        best = min(timeit.repeat(lambda: [func(m) for m in corpus], number=1, repeat=args.repeat))
+        results[name] = best
+        print(f"{name:>10}: {best:.3f}s  ({len(corpus) / best:,.0f} msg/s)")
+    print(f"speedup: {results['legacy'] / results['tokenizer']:.2f}x")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Local stand-in for the Bitbucket Server and Jira Cloud REST endpoints.
+
+Serves deterministic synthetic data so the fetch paths can be measured
+without network access:
+
+- ``GET /rest/api/1.0/projects/<P>/repos/<R>/commits`` pages through
+  ``commits`` commits, newest first (``start``/``limit``, ``isLastPage``,
+  ``nextPageStart``, ``withCounts``)
+- ``GET /rest/api/3/search`` pages through ``issues`` Jira issues
+  (``startAt``/``maxResults``/``total``)
+
+Every response can be delayed by ``latency`` seconds, and every
+``throttle_every``-th request is answered with ``429`` and ``Retry-After: 0``.
+
+    python benchmarks/fake_server.py --commits 10000 --issues 2000 --port 8099
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PROJECTS = ["PCM", "BCM", "CCM"]
+FIX_VERSION = "Mobilitas 2026.10.30"
+# Author timestamps start here and go back one commit every ten minutes
+NEWEST_COMMIT = datetime(2026, 10, 10)
+BITBUCKET_MAX_LIMIT = 1000
+JIRA_MAX_RESULTS = 100
+
+
+def story_key(number: int) -> str:
+    return f"{PROJECTS[number % len(PROJECTS)]}-{number}"
+
+
+def synthetic_commit(index: int, issues: int) -> dict:
+    """The ``index``-th newest commit, in the Bitbucket REST shape."""
+    timestamp = int((NEWEST_COMMIT - timedelta(minutes=10 * index)).timestamp() * 1000)
+    key = story_key(index % max(issues, 1))
+    message = [
+        f"{key}: fix rating for renewal",
+        f"Merge pull request #{index} in GW/pc from feature/{key}-rating to develop",
+        f"{key}_hotfix don't drop coverage\n\nSHA-256 checksum, UTF-8 output",
+        "Update dependencies",
+    ][index % 4]
+    return {
+        "id": f"{index:040x}",
+        "displayId": f"{index:011x}",
+        "author": {"name": "dev", "emailAddress": "dev@example.com", "displayName": "Dev"},
+        "authorTimestamp": timestamp,
+        "committer": {"name": "dev", "emailAddress": "dev@example.com", "displayName": "Dev"},
+        "committerTimestamp": timestamp,
+        "message": message,
+        "parents": [{"id": f"{index + 1:040x}", "displayId": f"{index + 1:011x}"}],
+    }
+
+
+def synthetic_issue(number: int) -> dict:
+    key = story_key(number)
+    return {
+        "key": key,
+        "fields": {
+            "summary": f"Story {key}",
+            "issuetype": {"name": "Story"},
+            "fixVersions": [{"name": FIX_VERSION}],
+            "components": [{"name": "PolicyCenter"}],
+            "status": {"name": "Ready for QA"},
+        },
+    }
+
+
+class FakeAtlassian:
+    """Threaded HTTP server on ``127.0.0.1``; use as a context manager.
+
+    ``bitbucket_url`` and ``jira_url`` are the API base URLs to point the
+    clients at.
+    """
+
+    def __init__(self, commits=1000, issues=500, latency=0.0, throttle_every=0, port=0):
+        self.commits = commits
+        self.issues = issues
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def bitbucket_url(self) -> str:
+        return f"{self.base_url}/rest/api/1.0"
+
+    @property
+    def jira_url(self) -> str:
+        return f"{self.base_url}/rest/api/3"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-atlassian", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def _throttle(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            if self.throttle_every and self.requests % self.throttle_every == 0:
+                self.throttled += 1
+                return True
+        return False
+
+    def commits_page(self, query: dict) -> dict:
+        start = int(query.get("start", ["0"])[0])
+        limit = min(int(query.get("limit", ["25"])[0]), BITBUCKET_MAX_LIMIT)
+        end = min(start + limit, self.commits)
+        page = {
+            "values": [synthetic_commit(i, self.issues) for i in range(start, end)],
+            "size": max(end - start, 0),
+            "start": start,
+            "limit": limit,
+            "isLastPage": end >= self.commits,
+        }
+        if end < self.commits:
+            page["nextPageStart"] = end
+        if query.get("withCounts", [""])[0] == "true":
+            page["totalCount"] = self.commits
+        return page
+
+    def search_page(self, query: dict) -> dict:
+        start = int(query.get("startAt", ["0"])[0])
+        limit = min(int(query.get("maxResults", ["50"])[0]), JIRA_MAX_RESULTS)
+        end = min(start + limit, self.issues)
+        return {
+            "startAt": start,
+            "maxResults": limit,
+            "total": self.issues,
+            "issues": [synthetic_issue(i) for i in range(start, end)],
+        }
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; don't let Nagle hold the body
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):  # noqa: A002 - quiet
+                pass
+
+            def _send(self, status, body, headers=()):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if fake._throttle():
+                    self._send(429, {"errors": [{"message": "Rate limit exceeded"}]}, [("Retry-After", "0")])
+                    return
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                if parts.path.startswith("/rest/api/1.0/projects/") and parts.path.endswith("/commits"):
+                    self._send(200, fake.commits_page(query))
+                elif parts.path == "/rest/api/3/search":
+                    self._send(200, fake.search_page(query))
+                else:
+                    self._send(404, {"errors": [{"message": f"No route for {parts.path}"}]})
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commits", type=int, default=10000)
+    parser.add_argument("--issues", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to delay every response")
+    parser.add_argument("--throttle-every", type=int, default=0, help="Answer every Nth request with 429")
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+    with FakeAtlassian(args.commits, args.issues, args.latency, args.throttle_every, args.port) as server:
+        print(f"Bitbucket: {server.bitbucket_url}")
+        print(f"Jira:      {server.jira_url}  (set JIRA_API_BASE to this)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,66 @@
+import math
+import time
 import requests
 import logging
-from datetime import datetime
+
+import http_client
+import run_metrics
+from commit_record import CommitRecord
+from resilience import DEFAULT_BREAKER_COOLDOWN
+from datetime import datetime, timedelta
 
 DEFAULT_FETCH_LIMIT = 100  # maximum commits per page supported by API
+DEFAULT_DATE_MARGIN = timedelta(days=7)  # slack for rebased/merged author timestamps
+DEFAULT_RESUME_ATTEMPTS = 2
+DEFAULT_RESUME_DELAY = DEFAULT_BREAKER_COOLDOWN
 
 logger = logging.getLogger(__name__)
 
+
+def _to_ms(value: datetime) -> int:
+    """Convert a naive local datetime to a Bitbucket millisecond timestamp."""
+    return int(value.timestamp() * 1000)
+
+
+class BranchFetchError(requests.exceptions.RequestException):
+    """A commit page could not be fetched; ``next_start`` is where to resume."""
+
+    def __init__(self, repo_name, branch, next_start, cause):
+        super().__init__(f"Failed to fetch {repo_name} branch {branch} at start={next_start}: {cause}")
+        self.repo_name = repo_name
+        self.branch = branch
+        self.next_start = next_start
+
+
+class CommitPage(list):
+    """Commits kept from one API page.
+
+    ``next_start`` is the offset of the following page, or ``None`` when this
+    was the last page fetched for the branch.
+    """
+
+    def __init__(self, commits=(), next_start=None):
+        super().__init__(commits)
+        self.next_start = next_start
+
+
+def _filter_window(values, start_date, end_date):
+    """Return the commits within ``[start_date, end_date]`` and the newest author date seen."""
+    filtered_commits = []
+    newest_date = None
+    for commit in values:
+        commit_date = datetime.fromtimestamp(commit["authorTimestamp"] / 1000)
+        if newest_date is None or commit_date > newest_date:
+            newest_date = commit_date
+        if start_date and commit_date < start_date:
+            continue
+        if end_date and commit_date > end_date:
+            continue
+        filtered_commits.append(commit)
+    return filtered_commits, newest_date
+
+
+@run_metrics.phase("fetch_commits")
 def fetch_commits(
     bitbucket_base_url,
     repo_name,
@@ -15,9 +70,61 @@ def fetch_commits(
     limit: int = DEFAULT_FETCH_LIMIT,
     start_date=None,
     end_date=None,
+    windowed: bool = False,
+    date_margin: timedelta = DEFAULT_DATE_MARGIN,
+    stats=None,
+    cache=None,
 ):
     """
     Fetch commits from a Bitbucket Server repository for a specific branch within a date range.
+
+    Collects every page yielded by :func:`iter_commit_pages`; see there for
+    the arguments.
+
+    Returns:
+        list: List of commit objects.
+    """
+    all_commits = []
+    for page in iter_commit_pages(
+        bitbucket_base_url,
+        repo_name,
+        branch,
+        bitbucket_auth,
+        bitbucket_headers,
+        limit,
+        start_date,
+        end_date,
+        windowed,
+        date_margin,
+        stats,
+        cache,
+    ):
+        all_commits.extend(page)
+    return all_commits
+
+
+def iter_commit_pages(
+    bitbucket_base_url,
+    repo_name,
+    branch,
+    bitbucket_auth,
+    bitbucket_headers,
+    limit: int = DEFAULT_FETCH_LIMIT,
+    start_date=None,
+    end_date=None,
+    windowed: bool = False,
+    date_margin: timedelta = DEFAULT_DATE_MARGIN,
+    stats=None,
+    cache=None,
+    start: int = 0,
+    seen_ids=None,
+):
+    """
+    Yield pages of commits from a Bitbucket Server branch within a date range.
+
+    Each yielded list holds the commits of one API page that fall inside the
+    window, so callers can process history while later pages are still being
+    downloaded.
     
     Args:
         bitbucket_base_url (str): Base URL of Bitbucket Server API.
@@ -28,9 +135,30 @@ def fetch_commits(
         limit (int): Number of commits per page.
         start_date (datetime): Start of date range (inclusive).
         end_date (datetime): End of date range (inclusive).
+        windowed (bool): Stop paginating once a whole page is older than
+            ``start_date - date_margin`` instead of walking the full history.
+        date_margin (timedelta): Safety margin for out-of-order author
+            timestamps introduced by rebases and merges.
+        stats (dict): Optional dict updated with paging counters
+            (``pages_fetched``, ``pages_kept``, ``pages_skipped``,
+            ``commits_filtered``, ``bytes_received``).
+        cache (CommitCache): Optional on-disk commit store. When the branch
+            is already cached only commits newer than the cached head are
+            requested (via ``since``) and the cached window is yielded after
+            them.
+        start (int): Page offset to start from, e.g. ``BranchFetchError.next_start``
+            when resuming a branch.
+        seen_ids (set): Ids of new commits already yielded by an earlier
+            attempt, so a resumed incremental fetch does not repeat them when
+            the cached window is merged.
     
-    Returns:
-        list: List of commit objects.
+    Yields:
+        CommitPage: Commit objects from one page (possibly empty), with the
+        offset of the next page.
+
+    Raises:
+        BranchFetchError: If a page cannot be fetched; carries the offset of
+            that page so the branch can be resumed.
     """
     # Extract project and repo from repo_name
     try:
@@ -41,38 +169,214 @@ def fetch_commits(
 
     commits_url = f"{bitbucket_base_url}/projects/{project}/repos/{repo}/commits?at=refs/heads/{branch}"
     logger.debug(f"Fetching commits from {commits_url}")
-    
-    all_commits = []
-    start = 0
+
+    cache_state = cache.branch_state(repo_name, branch) if cache is not None else None
+    if cache_state and start_date and cache_state["floor_ts"] > _to_ms(start_date):
+        logger.info(f"Commit cache for {repo_name} branch {branch} does not reach {start_date:%Y-%m-%d}; refetching")
+        cache.reset_branch(repo_name, branch)
+        cache_state = None
+
+    # An incremental fetch only covers new commits, so there is nothing to window
+    stop_early = windowed and start_date is not None and not cache_state
+    stop_before = start_date - date_margin if stop_early else None
+
+    # The branch head is the first commit of page 0; a resumed fetch leaves the
+    # cached head alone so the next run refreshes from the old one again
+    record_head = start == 0
     params = {"start": start, "limit": limit}
+    if cache_state:
+        # Only ask for commits reachable from the branch but not from the cached head
+        params["since"] = cache_state["head_id"]
+        params["until"] = f"refs/heads/{branch}"
+    if stop_early and start == 0:
+        # Only honoured on the first page; lets us report how much history we skipped
+        params["withCounts"] = "true"
+    total_count = None
+    head_id = None
+    new_ids = seen_ids if seen_ids is not None else set()
+    total_kept = 0
+    pages_fetched = 0
+    pages_kept = 0
+    commits_filtered = 0
+    bytes_received = 0
+    stopped_early = False
 
     while True:
         paginated_url = f"{commits_url}&start={start}&limit={limit}"
         try:
-            response = requests.get(paginated_url, auth=bitbucket_auth, headers=bitbucket_headers, params=params)
+            response = http_client.get(paginated_url, auth=bitbucket_auth, headers=bitbucket_headers, params=params)
             response.raise_for_status()
-            commits = response.json()
-            values = commits.get("values", [])
-            
-            # Filter commits by date range (client-side)
-            filtered_commits = []
-            for commit in values:
-                commit_date = datetime.fromtimestamp(commit["authorTimestamp"] / 1000)
-                if start_date and commit_date < start_date:
-                    continue
-                if end_date and commit_date > end_date:
-                    continue
-                filtered_commits.append(commit)
-            
-            all_commits.extend(filtered_commits)
-            
-            if commits.get("isLastPage", True):
-                break
-            start = commits.get("nextPageStart", start + limit)
-            params["start"] = start
+        except requests.exceptions.HTTPError as e:
+            if cache_state and start == 0 and e.response is not None and e.response.status_code == 404:
+                # Cached head no longer exists (history rewritten); start over
+                logger.info(f"Cached head for {repo_name} branch {branch} is gone; refetching full history")
+                cache.reset_branch(repo_name, branch)
+                yield from iter_commit_pages(
+                    bitbucket_base_url, repo_name, branch, bitbucket_auth, bitbucket_headers,
+                    limit, start_date, end_date, windowed, date_margin, stats, cache,
+                )
+                return
+            logger.warning(f"Failed to fetch commits for {repo_name} branch {branch}: {str(e)}")
+            raise BranchFetchError(repo_name, branch, start, e) from e
         except requests.exceptions.RequestException as e:
             logger.warning(f"Failed to fetch commits for {repo_name} branch {branch}: {str(e)}")
+            raise BranchFetchError(repo_name, branch, start, e) from e
+
+        bytes_received += len(response.content)
+        commits = response.json()
+        values = [CommitRecord.from_json(value) for value in commits.get("values", [])]
+        pages_fetched += 1
+        if total_count is None:
+            total_count = commits.get("totalCount")
+        params.pop("withCounts", None)
+        if record_head and head_id is None and values:
+            head_id = values[0]["id"]
+        if cache is not None:
+            cache.add_commits(repo_name, branch, values)
+        
+        # Filter commits by date range (client-side)
+        filtered_commits, newest_date = _filter_window(values, start_date, end_date)
+        
+        commits_filtered += len(values) - len(filtered_commits)
+        if filtered_commits:
+            pages_kept += 1
+            total_kept += len(filtered_commits)
+            if cache_state:
+                new_ids.update(c["id"] for c in filtered_commits)
+
+        next_start = None
+        if not commits.get("isLastPage", True):
+            if stop_early and newest_date is not None and newest_date < stop_before:
+                stopped_early = True
+            else:
+                next_start = commits.get("nextPageStart", start + limit)
+        # Yielded even when empty so consumers can track the cursor
+        yield CommitPage(filtered_commits, next_start)
+        if next_start is None:
+            break
+        start = next_start
+        params["start"] = start
+
+    pages_skipped = 0
+    if stopped_early and total_count is not None:
+        pages_skipped = max(math.ceil(total_count / limit) - pages_fetched, 0)
+    if stopped_early:
+        logger.info(
+            f"Stopped paging {repo_name} branch {branch} before {stop_before:%Y-%m-%d}: "
+            f"fetched {pages_fetched} pages, skipped "
+            f"{pages_skipped if total_count is not None else 'remaining'} pages"
+        )
+    if cache is not None:
+        if head_id is not None:
+            floor_ts = _to_ms(stop_before) if stopped_early else 0
+            if cache_state:
+                floor_ts = cache_state["floor_ts"]
+            cache.set_head(repo_name, branch, head_id, floor_ts)
+        if cache_state:
+            cached_commits = cache.load_commits(
+                repo_name,
+                branch,
+                _to_ms(start_date) if start_date else None,
+                _to_ms(end_date) if end_date else None,
+            )
+            cached_commits = [c for c in cached_commits if c["id"] not in new_ids]
+            logger.info(f"Merged {len(cached_commits)} cached commits for {repo_name} branch {branch}")
+            for offset in range(0, len(cached_commits), limit):
+                yield cached_commits[offset:offset + limit]
+            total_kept += len(cached_commits)
+
+    if stats is not None:
+        stats["pages_fetched"] = stats.get("pages_fetched", 0) + pages_fetched
+        stats["pages_kept"] = stats.get("pages_kept", 0) + pages_kept
+        stats["pages_skipped"] = stats.get("pages_skipped", 0) + pages_skipped
+        stats["commits_filtered"] = stats.get("commits_filtered", 0) + commits_filtered
+        stats["bytes_received"] = stats.get("bytes_received", 0) + bytes_received
+
+    logger.info(f"Total commits fetched for {repo_name} branch {branch}: {total_kept}")
+
+
+def iter_commit_pages_resumable(
+    *args,
+    resume_attempts: int = DEFAULT_RESUME_ATTEMPTS,
+    resume_delay: float = DEFAULT_RESUME_DELAY,
+    **kwargs,
+):
+    """
+    :func:`iter_commit_pages` that resumes from the last successful page.
+
+    When a page still fails after the HTTP layer's own retries, wait
+    ``resume_delay`` seconds (long enough for an open circuit breaker to let
+    a trial request through) and continue the branch from that page instead
+    of starting over, up to ``resume_attempts`` times.
+    """
+    kwargs["seen_ids"] = kwargs.get("seen_ids") if kwargs.get("seen_ids") is not None else set()
+    attempt = 0
+    while True:
+        try:
+            yield from iter_commit_pages(*args, **kwargs)
+            return
+        except BranchFetchError as e:
+            if attempt >= resume_attempts:
+                raise
+            attempt += 1
+            logger.warning(
+                f"Resuming {e.repo_name} branch {e.branch} from start={e.next_start} "
+                f"in {resume_delay:.0f}s (attempt {attempt}/{resume_attempts})"
+            )
+            time.sleep(resume_delay)
+            kwargs["start"] = e.next_start
+
+
+def iter_compare_pages(
+    bitbucket_base_url,
+    repo_name,
+    from_branch,
+    to_branch,
+    bitbucket_auth,
+    bitbucket_headers,
+    limit: int = DEFAULT_FETCH_LIMIT,
+    start_date=None,
+    end_date=None,
+):
+    """
+    Yield pages of commits reachable from ``from_branch`` but not from ``to_branch``.
+
+    Uses the Bitbucket compare endpoint, so only the difference between the
+    two branches is downloaded. Commits are filtered to the date window the
+    same way as :func:`iter_commit_pages`.
+
+    Yields:
+        list: Commit objects from one page.
+    """
+    try:
+        project, repo = repo_name.split('/')
+    except ValueError:
+        logger.error(f"Invalid repo_name format: {repo_name}. Expected 'PROJECT/REPO'.")
+        raise ValueError(f"Invalid repo_name: {repo_name}")
+
+    compare_url = f"{bitbucket_base_url}/projects/{project}/repos/{repo}/compare/commits"
+    params = {
+        "from": f"refs/heads/{from_branch}",
+        "to": f"refs/heads/{to_branch}",
+        "start": 0,
+        "limit": limit,
+    }
+    total_kept = 0
+    while True:
+        try:
+            response = http_client.get(compare_url, auth=bitbucket_auth, headers=bitbucket_headers, params=params)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Failed to compare {from_branch} with {to_branch} for {repo_name}: {str(e)}")
             raise
-    
-    logger.info(f"Total commits fetched for {repo_name} branch {branch}: {len(all_commits)}")
-    return all_commits
+        commits = response.json()
+        values = [CommitRecord.from_json(value) for value in commits.get("values", [])]
+        filtered_commits, _ = _filter_window(values, start_date, end_date)
+        if filtered_commits:
+            total_kept += len(filtered_commits)
+            yield filtered_commits
+        if commits.get("isLastPage", True):
+            break
+        params["start"] = commits.get("nextPageStart", params["start"] + limit)
+
+    logger.info(f"Commits on {from_branch} but not {to_branch} for {repo_name}: {total_kept}")
@@ -0,0 +1,150 @@
+# src/checkpoint.py
+import hashlib
+import json
+import logging
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_DIR = "checkpoints"
+COMMITS_FILE = "commits.jsonl"
+JIRA_FILE = "jira.jsonl"
+
+
+def run_key(settings: Dict[str, object]) -> str:
+    """Short stable hash of the settings that make two runs interchangeable."""
+    encoded = json.dumps(settings, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class Checkpoint:
+    """Append-only progress log for one audit run.
+
+    ``commits.jsonl`` gets one line per processed commit page with the
+    Bitbucket cursor (``next_start``) and the commits extracted from it, plus
+    a ``done`` line per finished (repo, branch). ``jira.jsonl`` gets one line
+    per Jira search page. Lines are flushed as they are written, so a run
+    that dies loses at most the page in flight; ``--resume`` replays the
+    logged pages and continues from the last cursor.
+    """
+
+    def __init__(self, directory: Path, resume: bool = False):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._branches: Dict[Tuple[str, str], Dict[str, object]] = {}
+        self._jira_pages: Dict[int, dict] = {}
+        if resume:
+            self._load()
+        elif self.directory.exists():
+            shutil.rmtree(self.directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._commits_file = (self.directory / COMMITS_FILE).open("a", encoding="utf-8")
+        self._jira_file = (self.directory / JIRA_FILE).open("a", encoding="utf-8")
+
+    @classmethod
+    def for_run(cls, settings: Dict[str, object], base_dir: str = DEFAULT_CHECKPOINT_DIR, resume: bool = False):
+        directory = Path(base_dir) / run_key(settings)
+        if resume and not directory.exists():
+            logger.info("No checkpoint found in %s; starting from scratch", directory)
+        return cls(directory, resume=resume)
+
+    @staticmethod
+    def _read_lines(path: Path) -> List[dict]:
+        if not path.exists():
+            return []
+        records = []
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A line cut short when the run died
+                    logger.debug("Ignoring truncated checkpoint line in %s", path)
+        return records
+
+    def _load(self) -> None:
+        for record in self._read_lines(self.directory / COMMITS_FILE):
+            state = self._branches.setdefault(
+                (record["repo"], record["branch"]),
+                {"app": record.get("app"), "next_start": 0, "entries": [], "done": False},
+            )
+            if record.get("done"):
+                state["done"] = True
+                continue
+            state["entries"].extend(record.get("entries", []))
+            if record.get("next_start") is not None:
+                state["next_start"] = record["next_start"]
+        for record in self._read_lines(self.directory / JIRA_FILE):
+            self._jira_pages[record["start_at"]] = record
+        if self._branches or self._jira_pages:
+            logger.info(
+                "Resuming from checkpoint %s: %d branches (%d done), %d Jira pages",
+                self.directory,
+                len(self._branches),
+                sum(1 for state in self._branches.values() if state["done"]),
+                len(self._jira_pages),
+            )
+
+    def _append(self, handle, record: dict) -> None:
+        line = json.dumps(record, default=str)
+        with self._lock:
+            handle.write(line + "\n")
+            handle.flush()
+
+    # Commit pages -------------------------------------------------------
+
+    def branch_done(self, repo: str, branch: str) -> bool:
+        state = self._branches.get((repo, branch))
+        return bool(state and state["done"])
+
+    def resume_start(self, repo: str, branch: str) -> int:
+        state = self._branches.get((repo, branch))
+        return int(state["next_start"]) if state else 0
+
+    def restored_branches(self) -> List[Tuple[str, str, str, List[dict]]]:
+        """Return ``(repo, app, branch, entries)`` for every branch in the checkpoint."""
+        return [(repo, state["app"], branch, state["entries"]) for (repo, branch), state in self._branches.items()]
+
+    def record_page(self, repo: str, app: str, branch: str, next_start: Optional[int], entries: List[dict]) -> None:
+        self._append(
+            self._commits_file,
+            {"repo": repo, "app": app, "branch": branch, "next_start": next_start, "entries": entries},
+        )
+
+    def record_branch_done(self, repo: str, app: str, branch: str) -> None:
+        self._append(self._commits_file, {"repo": repo, "app": app, "branch": branch, "done": True})
+        with self._lock:
+            state = self._branches.setdefault(
+                (repo, branch), {"app": app, "next_start": 0, "entries": [], "done": False}
+            )
+            state["done"] = True
+
+    # Jira pages ---------------------------------------------------------
+
+    def jira_page(self, start_at: int) -> Optional[dict]:
+        """Return ``{"start_at", "total", "max_results", "issues"}`` if that page was logged."""
+        return self._jira_pages.get(start_at)
+
+    def record_jira_page(self, start_at: int, data: dict) -> None:
+        record = {
+            "start_at": start_at,
+            "total": data.get("total", 0),
+            "max_results": data.get("maxResults"),
+            "issues": data.get("issues", []),
+        }
+        self._append(self._jira_file, record)
+
+    # Lifecycle ----------------------------------------------------------
+
+    def close(self) -> None:
+        with self._lock:
+            self._commits_file.close()
+            self._jira_file.close()
+
+    def discard(self) -> None:
+        """Remove the checkpoint after a successful run."""
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,113 @@
+# src/commit_cache.py
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from commit_record import CommitRecord
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ".cache"
+CACHE_FILE_NAME = "commits.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS commits (
+    repo TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    id TEXT NOT NULL,
+    message TEXT NOT NULL,
+    author_ts INTEGER NOT NULL,
+    PRIMARY KEY (repo, branch, id)
+);
+CREATE INDEX IF NOT EXISTS commits_by_time ON commits (repo, branch, author_ts);
+CREATE TABLE IF NOT EXISTS branches (
+    repo TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    head_id TEXT NOT NULL,
+    floor_ts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (repo, branch)
+);
+"""
+
+
+class CommitCache:
+    """SQLite store of commits already fetched per repository and branch.
+
+    Commits are immutable once they exist, so a branch only needs to be paged
+    down to the head recorded by the previous run. ``floor_ts`` records the
+    author timestamp (ms) below which history was not fetched because the
+    earlier run used a windowed fetch; ``0`` means the full history is cached.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        path = Path(cache_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        self.path = path / CACHE_FILE_NAME
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        logger.debug("Opened commit cache at %s", self.path)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def branch_state(self, repo: str, branch: str) -> Optional[Dict[str, object]]:
+        """Return ``{"head_id", "floor_ts"}`` for a cached branch, or ``None``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT head_id, floor_ts FROM branches WHERE repo = ? AND branch = ?",
+                (repo, branch),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"head_id": row[0], "floor_ts": row[1]}
+
+    def add_commits(self, repo: str, branch: str, commits: Iterable[dict]) -> None:
+        """Store raw Bitbucket commit objects, keeping only the fields we use."""
+        rows = [(repo, branch, c["id"], c["message"], int(c["authorTimestamp"])) for c in commits]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO commits (repo, branch, id, message, author_ts) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def set_head(self, repo: str, branch: str, head_id: str, floor_ts: int = 0) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO branches (repo, branch, head_id, floor_ts) VALUES (?, ?, ?, ?)",
+                (repo, branch, head_id, int(floor_ts)),
+            )
+
+    def reset_branch(self, repo: str, branch: str) -> None:
+        """Forget everything cached for a branch (e.g. after a history rewrite)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM commits WHERE repo = ? AND branch = ?", (repo, branch))
+            self._conn.execute("DELETE FROM branches WHERE repo = ? AND branch = ?", (repo, branch))
+
+    def load_commits(
+        self,
+        repo: str,
+        branch: str,
+        start_ts: Optional[int] = None,
+        end_ts: Optional[int] = None,
+    ) -> List[CommitRecord]:
+        """Return cached commits for a branch within ``[start_ts, end_ts]`` (ms), newest first."""
+        query = "SELECT id, message, author_ts FROM commits WHERE repo = ? AND branch = ?"
+        args: list = [repo, branch]
+        if start_ts is not None:
+            query += " AND author_ts >= ?"
+            args.append(int(start_ts))
+        if end_ts is not None:
+            query += " AND author_ts <= ?"
+            args.append(int(end_ts))
+        query += " ORDER BY author_ts DESC"
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return [CommitRecord(r[0], r[1], r[2]) for r in rows]
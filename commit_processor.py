@@ -1,6 +1,10 @@
 # src/commit_processor.py
 import re
+import sys
+import threading
 from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,12 +13,17 @@ logger = logging.getLogger(__name__)
 STORY_PATTERN = re.compile(r"[A-Z]+-\d+", re.IGNORECASE)
 VALIDATION_PATTERN = re.compile(r"^[A-Z]+-\d+$")
 CONCAT_PATTERN = re.compile(r"([A-Z]+-\d+)([_-]\w+)+", re.IGNORECASE)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+# Escaped apostrophes (which may themselves contain stray quotes) and anything
+# outside the allowed character set. The backslash is matched on its own so a
+# run of punctuation cannot swallow the start of a following \u0027
+DROP_PATTERN = re.compile(r"\\'*u'*0'*0'*2'*7|[^a-zA-Z0-9\s:/_.\\-]+|\\")
+# A story key plus any "_suffix"/"-suffix" glued onto it (e.g. ABC-123_fix-DEF-4)
+STORY_TOKEN_PATTERN = re.compile(r"([A-Z]+-\d+)(?:[_-]\w+)*", re.IGNORECASE)
 
 def clean_commit_message(message):
-    message = re.sub(r'[\r\n\t]+', ' ', message)
-    message = re.sub(r'\s+', ' ', message)
-    message = message.replace("'", "").replace("\\u0027", "")
-    message = re.sub(r'[^a-zA-Z0-9\s:/_.-]', '', message)
+    message = WHITESPACE_PATTERN.sub(' ', message)
+    message = DROP_PATTERN.sub('', message)
     return message.strip()
 
 def preprocess_commit_message(message):
@@ -26,28 +35,197 @@ def preprocess_commit_message(message):
     logger.debug(f"Preprocessed '{message}' to '{preprocessed_message}'")
     return preprocessed_message
 
-def extract_stories(commit, fix_version, jira_story_data, app_name, commit_hash, branch,
-                    cutoff_date_obj, code_freeze_date, develop_branch, git_story_numbers, commit_hashes,
-                    exclude_patterns=None):
-    if exclude_patterns is None:
-        exclude_patterns = []
-    exclude_regex = [re.compile(pattern, re.IGNORECASE) for pattern in exclude_patterns]
+def tokenize_commit_message(message):
+    """Return the cleaned message and the upper-cased story keys it references.
+
+    Replaces the ``clean_commit_message`` -> ``preprocess_commit_message`` ->
+    ``STORY_PATTERN.finditer`` chain: suffixes glued onto a key are consumed by
+    the same scan that finds the key instead of rewriting the message once per
+    concatenated key. The cleaned message is unchanged. The only difference
+    in the keys is that a key whose text was also rewritten by an unrelated
+    earlier ``str.replace`` (``AB-1_2 AB-1_23``) now yields ``AB-1`` rather
+    than ``AB-13``.
+    """
+    cleaned = clean_commit_message(message)
+    return cleaned, [key.upper() for key in STORY_TOKEN_PATTERN.findall(cleaned)]
+
+@lru_cache(maxsize=32)
+def _compile_excludes(patterns):
+    return [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+
+# Story key classifications produced by StoryKeyIndex
+IN_RELEASE = "in release"
+WRONG_FIX_VERSION = "wrong fixVersion"
+NOT_LOADED = "not loaded"
+UNKNOWN_PROJECT = "unknown project"
+
+def _project_of(story_number):
+    return story_number.rpartition("-")[0]
+
+class StoryKeyIndex:
+    """Lookup tables built once from the loaded Jira stories.
+
+    Classifies story keys referenced by commits as ``IN_RELEASE``,
+    ``WRONG_FIX_VERSION`` (loaded but for another fixVersion), ``NOT_LOADED``
+    (a known project, but the key was not loaded) or ``UNKNOWN_PROJECT``
+    (tokens such as ``UTF-8`` or ``SHA-256`` that merely look like keys).
+    Project prefixes come from the loaded keys plus ``extra_projects``. With
+    no projects at all nothing is treated as unknown, so a failed Jira load
+    does not hide every commit.
+    """
+
+    def __init__(self, jira_story_data, fix_version, extra_projects=()):
+        self.stories = jira_story_data
+        self.fix_version = fix_version
+        self.in_release = frozenset(
+            key for key, story in jira_story_data.items() if story.get("FixVersion") == fix_version
+        )
+        self.wrong_fix_version = frozenset(jira_story_data).difference(self.in_release)
+        self.projects = frozenset(_project_of(key) for key in jira_story_data) | frozenset(
+            project.upper() for project in extra_projects
+        )
+
+    def classify(self, story_number):
+        if story_number in self.in_release:
+            return IN_RELEASE
+        if story_number in self.wrong_fix_version:
+            return WRONG_FIX_VERSION
+        if self.projects and _project_of(story_number) not in self.projects:
+            return UNKNOWN_PROJECT
+        return NOT_LOADED
+
+    def classify_keys(self, story_numbers):
+        """Group ``story_numbers`` by classification, preserving order."""
+        groups = {IN_RELEASE: [], WRONG_FIX_VERSION: [], NOT_LOADED: [], UNKNOWN_PROJECT: []}
+        for story_number in story_numbers:
+            groups[self.classify(story_number)].append(story_number)
+        return groups
+
+class StoryRef(NamedTuple):
+    """One commit referencing a story."""
+    app: str
+    branch: str
+    commit_hash: str
+    timestamp: int
+
+def add_story_ref(story_refs, story_number, app_name, branch, commit_hash, timestamp):
+    story_refs.setdefault(story_number, []).append(StoryRef(app_name, branch, commit_hash, timestamp))
+
+def _intern(value):
+    # Rows repeat the same app, branch, issue type and fixVersion strings
+    return sys.intern(value) if isinstance(value, str) else value
+
+def story_sort_key(story_number):
+    """Sort story keys by project, then numerically (PCM-9 before PCM-10)."""
+    project, _, number = story_number.rpartition("-")
+    return (project, int(number) if number.isdigit() else 0, story_number)
+
+def merge_story_refs(shards):
+    """Merge per-worker ``story -> [StoryRef]`` shards into one sorted index.
 
+    Each worker owns its shard, so no locking is needed while extracting and
+    the merged result does not depend on thread scheduling.
+    """
+    merged = {}
+    for shard in shards:
+        for story_number, refs in shard.items():
+            merged.setdefault(story_number, []).extend(refs)
+    return {story_number: sorted(set(merged[story_number])) for story_number in sorted(merged, key=story_sort_key)}
+
+class CommitMemo:
+    """Per-run cache of extracted rows keyed by app and commit id.
+
+    Most release-branch commits are also on develop. The first branch that
+    yields a commit stores its rows; later branches only append themselves to
+    the "Commit Source" of those rows instead of extracting again.
+    """
+
+    def __init__(self):
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def seen(self, app_name, commit_hash, branch):
+        """Return the story numbers of an already extracted commit, or ``None``.
+
+        ``branch`` is added to the Commit Source of the commit's rows.
+        """
+        with self._lock:
+            entry = self._rows.get((app_name, commit_hash))
+            if entry is None:
+                return None
+            rows, story_numbers = entry
+            for row in rows:
+                sources = row["Commit Source"].split(", ")
+                if branch not in sources:
+                    # Sorted so concurrent branch fetches give the same text
+                    row["Commit Source"] = _intern(", ".join(sorted(sources + [branch])))
+            return story_numbers
+
+    def store(self, app_name, commit_hash, rows, story_numbers):
+        with self._lock:
+            self._rows[(app_name, commit_hash)] = (rows, story_numbers)
+
+    def story_rows(self):
+        """Yield ``(story_number, row)`` for every extracted row."""
+        with self._lock:
+            entries = list(self._rows.values())
+        for rows, story_numbers in entries:
+            # extract_stories appends one row per matched story, in order
+            yield from zip(story_numbers, rows)
+
+def enrich_rows(memo, stories):
+    """Fill in the Jira fields of rows whose story was looked up after extraction.
+
+    Returns the number of rows updated.
+    """
+    updated = 0
+    for story_number, row in memo.story_rows():
+        story = stories.get(story_number)
+        if story is None:
+            continue
+        row["Issue Type"] = _intern(story.get("IssueType", "Unknown"))
+        row["App"] = _intern(story.get("App", row["App"]))
+        row["FixVersion"] = _intern(story.get("FixVersion", "Unknown"))
+        updated += 1
+    return updated
+
+def commit_in_window(commit, branch, cutoff_date_obj, code_freeze_date, develop_branch):
+    """Apply the audit date window; develop commits after code freeze are ignored."""
     commit_date = datetime.fromtimestamp(commit["authorTimestamp"] / 1000)
-    if commit_date < cutoff_date_obj or (branch == develop_branch and commit_date > code_freeze_date):
-        logger.debug(f"Skipping commit {commit_hash} - outside date range ({commit_date})")
+    return not (commit_date < cutoff_date_obj or (branch == develop_branch and commit_date > code_freeze_date))
+
+def extract_stories(commit, fix_version, jira_story_data, app_name, commit_hash, branch,
+                    cutoff_date_obj, code_freeze_date, develop_branch, story_refs,
+                    exclude_patterns=None, story_index=None, matched_stories=None, key_classes=None):
+    """Return report rows for the stories referenced by ``commit``.
+
+    Every recorded story gets a :class:`StoryRef` in ``story_refs`` (the
+    calling worker's shard) and, if given, is appended to ``matched_stories``.
+    With a ``story_index`` the keys in the message are counted per
+    classification into ``key_classes``, if given.
+    """
+    exclude_regex = _compile_excludes(tuple(exclude_patterns or ()))
+
+    if not commit_in_window(commit, branch, cutoff_date_obj, code_freeze_date, develop_branch):
+        logger.debug(f"Skipping commit {commit_hash} - outside date range")
         return []
 
     raw_message = commit["message"]
     logger.debug(f"Raw commit message for {commit_hash}: '{raw_message}'")
-    cleaned_message = clean_commit_message(raw_message)
-    preprocessed_message = preprocess_commit_message(cleaned_message)
+    cleaned_message, story_numbers = tokenize_commit_message(raw_message)
+    if story_index is not None:
+        # One set lookup per key; UTF-8, SHA-256 etc. are dropped here
+        classes = story_index.classify_keys(story_numbers)
+        if key_classes is not None:
+            for key_class, keys in classes.items():
+                key_classes[key_class] = key_classes.get(key_class, 0) + len(keys)
+        if classes[UNKNOWN_PROJECT]:
+            unknown = set(classes[UNKNOWN_PROJECT])
+            story_numbers = [key for key in story_numbers if key not in unknown]
 
-    story_matches = STORY_PATTERN.finditer(preprocessed_message)
     filtered_commits = []
-    for match in story_matches:
-        story_number = match.group().strip().upper()
-        logger.debug(f"Matched story number: {story_number} (at index {match.start()})")
+    for story_number in story_numbers:
+        logger.debug(f"Matched story number: {story_number}")
         
         # Check against exclude patterns
         if any(pattern.match(story_number) for pattern in exclude_regex):
@@ -55,17 +233,26 @@ def extract_stories(commit, fix_version, jira_story_data, app_name, commit_hash,
             continue
 
         if VALIDATION_PATTERN.match(story_number):
-            if story_number in jira_story_data and jira_story_data[story_number]["FixVersion"] != fix_version:
+            if story_index is not None:
+                wrong_fix_version = story_number in story_index.wrong_fix_version
+            else:
+                wrong_fix_version = (
+                    story_number in jira_story_data
+                    and jira_story_data[story_number]["FixVersion"] != fix_version
+                )
+            if wrong_fix_version:
                 logger.debug(f"Skipping {story_number} - fixVersion mismatch")
                 continue
-            git_story_numbers[story_number] = app_name
-            commit_hashes[story_number] = commit_hash
-            issue_type = jira_story_data.get(story_number, {}).get("IssueType", "Unknown")
-            fix_version_field = jira_story_data.get(story_number, {}).get("FixVersion", "Unknown")
-            app = jira_story_data.get(story_number, {}).get("App", app_name)
+            add_story_ref(story_refs, story_number, app_name, branch, commit_hash, commit["authorTimestamp"])
+            if matched_stories is not None:
+                matched_stories.append(story_number)
+            story = jira_story_data.get(story_number, {})
             filtered_commits.append({
-                "Commit Hash": commit_hash, "Message": cleaned_message, "Issue Type": issue_type,
-                "App": app, "FixVersion": fix_version_field, "Commit Source": branch
+                "Commit Hash": commit_hash, "Message": cleaned_message,
+                "Issue Type": _intern(story.get("IssueType", "Unknown")),
+                "App": _intern(story.get("App", app_name)),
+                "FixVersion": _intern(story.get("FixVersion", "Unknown")),
+                "Commit Source": _intern(branch),
             })
         else:
             logger.debug(f"Invalid story number format: {story_number}")
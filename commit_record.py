@@ -0,0 +1,48 @@
+# src/commit_record.py
+from typing import Any, Mapping
+
+
+class CommitRecord:
+    """The commit fields the audit reads, without the rest of the REST payload.
+
+    Bitbucket returns author and committer objects, parents and properties
+    for every commit; keeping only ``id``, ``message`` and
+    ``authorTimestamp`` in a slotted object is roughly ten times smaller.
+    Item access (``commit["id"]``) still works, so code written against the
+    JSON dicts does not need to change.
+    """
+
+    __slots__ = ("id", "message", "authorTimestamp")
+
+    def __init__(self, id: str, message: str, authorTimestamp: int):
+        self.id = id
+        self.message = message
+        self.authorTimestamp = authorTimestamp
+
+    @classmethod
+    def from_json(cls, value: Mapping[str, Any]) -> "CommitRecord":
+        return cls(value["id"], value.get("message") or "", int(value["authorTimestamp"]))
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other):
+        if not isinstance(other, CommitRecord):
+            return NotImplemented
+        return (self.id, self.message, self.authorTimestamp) == (
+            other.id, other.message, other.authorTimestamp
+        )
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"CommitRecord(id={self.id!r}, authorTimestamp={self.authorTimestamp!r})"
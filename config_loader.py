@@ -28,6 +28,11 @@ DEFAULT_CONFIG = {
     "release_branch": "release",
     "develop_branch": "develop",
     "commit_fetch_limit": 100,
+    "windowed_fetch": False,
+    "fetch_date_margin_days": 7,
+    "commit_cache": True,
+    "commit_cache_dir": ".cache",
+    "jira_cache": True,
 }
 
 # Default environment content created if .env is missing
@@ -1,33 +1,43 @@
+import hashlib
 import os
+import pickle
+import re
+import tempfile
 import pandas as pd
 import logging
-from typing import Dict
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from commit_cache import DEFAULT_CACHE_DIR
 
 logger = logging.getLogger(__name__)
 
+CSV_CHUNK_SIZE = 5000
+CACHE_VERSION = 1
 
-def load_jira_excel(path: str) -> Dict[str, dict]:
-    """Load Jira issues from an exported Excel file.
+# Jira exports repeat multi-value columns ("Component/s", "Component/s.1", ...)
+COMPONENT_COLUMNS = re.compile(r"^(components|component/s)(\.\d+)?$")
+FIX_VERSION_COLUMNS = re.compile(r"^(fix_versions|fix_version/s)(\.\d+)?$")
 
-    The Excel file should contain at least the following columns:
-    - Issue key
-    - Summary
-    - Issue type
-    - Components
-    - Fix version(s)
-    """
-    try:
-        if path.lower().endswith(".csv"):
-            df = pd.read_csv(path)
-        else:
-            df = pd.read_excel(path)
-    except Exception as exc:
-        logger.error("Failed to read Jira Excel %s: %s", path, exc)
-        raise
 
+def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     # Normalize columns by making them lowercase and underscores
     df.columns = [str(col).strip().replace(" ", "_").lower() for col in df.columns]
+    return df
+
+
+def _joined(df: pd.DataFrame, pattern: re.Pattern) -> pd.Series:
+    """Join the non-empty values of every column matching ``pattern`` with ", "."""
+    columns = [col for col in df.columns if pattern.match(col)]
+    joined = pd.Series("", index=df.index, dtype=object)
+    for col in columns:
+        values = df[col].fillna("").astype(str).str.strip()
+        joined = joined.where(values == "", joined.where(joined == "", joined + ", ") + values)
+    return joined
 
+
+def _stories_from_frame(df: pd.DataFrame, jira_base: str) -> Dict[str, dict]:
+    df = _normalize_columns(df)
     key_col = None
     for col in ["issue_key", "key"]:
         if col in df.columns:
@@ -41,17 +51,108 @@ def load_jira_excel(path: str) -> Dict[str, dict]:
     if missing:
         raise ValueError(f"Excel missing required columns: {', '.join(missing)}")
 
+    keys = df[key_col].str.strip().str.upper()
+    valid = keys.notna() & (keys != "")
+    df = df[valid]
+    keys = keys[valid]
+    columns = {
+        "Jira Story": keys,
+        "IssueType": df["issue_type"].fillna(""),
+        "Summary": df["summary"].fillna(""),
+        "App": _joined(df, COMPONENT_COLUMNS),
+        "FixVersion": _joined(df, FIX_VERSION_COLUMNS),
+        "Link": f"{jira_base.rstrip('/')}/" + keys,
+    }
+    if "status" in df.columns:
+        columns["Status"] = df["status"].fillna("")
+    names = list(columns)
+    # Later rows win for duplicate keys, as with a plain dict update
+    return {
+        values[0]: dict(zip(names, values))
+        for values in zip(*(columns[name].tolist() for name in names))
+    }
+
+
+def _read_frames(path: str) -> Iterable[pd.DataFrame]:
+    if path.lower().endswith(".csv"):
+        yield from pd.read_csv(path, dtype=str, chunksize=CSV_CHUNK_SIZE)
+    else:
+        yield pd.read_excel(path, dtype=str)
+
+
+def _cache_file(cache_dir: str, path: str) -> Path:
+    digest = hashlib.sha256(str(Path(path).resolve()).encode("utf-8")).hexdigest()[:16]
+    return Path(cache_dir) / f"jira_export_{digest}.pickle"
+
+
+def _fingerprint(path: str, jira_base: str) -> tuple:
+    stat = os.stat(path)
+    return (CACHE_VERSION, str(Path(path).resolve()), stat.st_mtime_ns, stat.st_size, jira_base)
+
+
+def _load_cached(cache_file: Path, fingerprint: tuple) -> Optional[Dict[str, dict]]:
+    try:
+        with cache_file.open("rb") as f:
+            cached = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as exc:
+        logger.warning("Ignoring unreadable Jira export cache %s: %s", cache_file, exc)
+        return None
+    if cached.get("fingerprint") != fingerprint:
+        return None
+    return cached["stories"]
+
+
+def _save_cached(cache_file: Path, fingerprint: tuple, stories: Dict[str, dict]) -> None:
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    # A unique temp name, so concurrent runs never write to the same file
+    fd, tmp = tempfile.mkstemp(dir=str(cache_file.parent), prefix=cache_file.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump({"fingerprint": fingerprint, "stories": stories}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_file)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def load_jira_excel(path: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> Dict[str, dict]:
+    """Load Jira issues from an exported Excel file.
+
+    The Excel file should contain at least the following columns:
+    - Issue key
+    - Summary
+    - Issue type
+    - Components
+    - Fix version(s)
+
+    CSV exports are read in chunks. The parsed stories are cached under
+    ``cache_dir`` (``None`` disables the cache) and reused while the file's
+    path, modification time and size are unchanged.
+    """
     jira_base = os.getenv("JIRA_BASE_URL", "https://csaaig.atlassian.net/browse")
+    fingerprint = cache_file = None
+    if cache_dir is not None:
+        fingerprint = _fingerprint(path, jira_base)
+        cache_file = _cache_file(cache_dir, path)
+        stories = _load_cached(cache_file, fingerprint)
+        if stories is not None:
+            logger.info("Loaded %d Jira issues from cache %s", len(stories), cache_file)
+            return stories
+
     stories = {}
-    for _, row in df.iterrows():
-        key = str(row[key_col]).strip().upper()
-        stories[key] = {
-            "Jira Story": key,
-            "IssueType": row.get("issue_type", ""),
-            "Summary": row.get("summary", ""),
-            "App": row.get("components", ""),
-            "FixVersion": row.get("fix_versions", ""),
-            "Link": f"{jira_base.rstrip('/')}/{key}",
-        }
+    try:
+        for df in _read_frames(path):
+            stories.update(_stories_from_frame(df, jira_base))
+    except Exception as exc:
+        logger.error("Failed to read Jira Excel %s: %s", path, exc)
+        raise
+
+    if cache_file is not None:
+        try:
+            _save_cached(cache_file, fingerprint, stories)
+        except OSError as exc:
+            logger.warning("Could not cache Jira export %s: %s", path, exc)
     logger.info("Loaded %d Jira issues", len(stories))
     return stories
@@ -1,36 +1,82 @@
 # src/excel_writer.py
-import pandas as pd
 import logging
 
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+import run_metrics
+
 logger = logging.getLogger(__name__)
 
+# Same header look as pandas' DataFrame.to_excel
+_THIN = Side(style="thin")
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="top")
+
+
+def _header_row(sheet, columns):
+    cells = []
+    for column in columns:
+        cell = WriteOnlyCell(sheet, value=column)
+        cell.font = HEADER_FONT
+        cell.border = HEADER_BORDER
+        cell.alignment = HEADER_ALIGNMENT
+        cells.append(cell)
+    return cells
+
+
+def status_after_app(columns):
+    if "Status" in columns and "App" in columns:
+        columns = [column for column in columns if column != "Status"]
+        columns.insert(columns.index("App") + 1, "Status")
+    return columns
+
+
+def write_rows(sheet, rows, reorder=None):
+    """Stream dict ``rows`` into a write-only ``sheet``; returns the row count.
+
+    Columns are taken from the first row (all rows produced by the audit
+    share the same keys). Keys missing from a later row are left blank.
+    """
+    count = 0
+    columns = None
+    for row in rows:
+        if columns is None:
+            columns = list(row)
+            if reorder is not None:
+                columns = reorder(columns)
+            sheet.append(_header_row(sheet, columns))
+        sheet.append([row.get(column) for column in columns])
+        count += 1
+    return count
+
+
+@run_metrics.phase("write_excel")
 def write_excel(all_commits, missing_stories_data, output_file):
     """
     Write commit data and missing stories to an Excel file.
-    
+
+    Rows are streamed into write-only worksheets, so memory does not grow
+    with the size of the report.
+
     Args:
-        all_commits (dict): Dictionary of app_name to list of commits.
+        all_commits (dict): Dictionary of app_name to an iterable of commits.
         missing_stories_data (list): List of missing stories data.
         output_file (str): Path to the output Excel file.
     """
-    with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
-        if all_commits:
-            for app_name, commits in all_commits.items():
-                logger.info("Exporting %s with %d commits", app_name, len(commits))
-                pd.DataFrame(commits).to_excel(writer, sheet_name=app_name, index=False)
-        else:
-            pd.DataFrame({"Info": ["No commit data fetched"]}).to_excel(
-                writer, sheet_name="Commits", index=False
-            )
-
-        if missing_stories_data:
-            df = pd.DataFrame(missing_stories_data)
-            if "Status" in df.columns and "App" in df.columns:
-                cols = df.columns.tolist()
-                cols.remove("Status")
-                app_index = cols.index("App")
-                cols.insert(app_index + 1, "Status")
-                df = df[cols]
-            df.to_excel(writer, sheet_name="Missing Jira Stories", index=False)
-        else:
-            logger.info("No missing Jira stories found or no commits fetched to compare.")
+    workbook = Workbook(write_only=True)
+    if all_commits:
+        for app_name, commits in all_commits.items():
+            count = write_rows(workbook.create_sheet(app_name), commits)
+            logger.info("Exported %s with %d commits", app_name, count)
+    else:
+        write_rows(workbook.create_sheet("Commits"), [{"Info": "No commit data fetched"}])
+
+    if missing_stories_data:
+        sheet = workbook.create_sheet("Missing Jira Stories")
+        write_rows(sheet, missing_stories_data, reorder=status_after_app)
+    else:
+        logger.info("No missing Jira stories found or no commits fetched to compare.")
+    workbook.save(output_file)
@@ -0,0 +1,161 @@
+# src/http_archive.py
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from http.client import responses as REASONS
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.models import PreparedRequest
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.jsonl"
+BLOB_DIR = "blobs"
+# Response headers worth keeping; everything else (cookies, auth echoes) is dropped
+KEPT_HEADERS = ("Content-Type", "Retry-After", "X-RateLimit-Reset")
+
+
+class ReplayMissError(requests.exceptions.RequestException):
+    """Raised in replay mode for a request the archive has no response for."""
+
+
+def request_key(method: str, url: str, params=None, json_body=None, data=None) -> str:
+    """Identify a request by method, URL with sorted query, and body.
+
+    Headers are left out so that credentials never end up in the archive
+    and a replay does not need them.
+    """
+    prepared = PreparedRequest()
+    prepared.prepare_url(url, params)
+    parts = urlsplit(prepared.url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    canonical = {
+        "method": method.upper(),
+        "url": urlunsplit((parts.scheme, parts.netloc, parts.path, query, "")),
+    }
+    if json_body is not None:
+        canonical["json"] = json_body
+    if data is not None:
+        canonical["data"] = data if isinstance(data, str) else repr(data)
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class HttpArchive:
+    """Directory of recorded HTTP responses, used by :mod:`http_client`.
+
+    Bodies are stored gzip-compressed under ``blobs/`` and named by the
+    SHA-256 of their content, so identical responses (e.g. an empty last
+    page requested by several branches) are kept once. ``index.jsonl`` maps
+    each request key (see :func:`request_key`) to the status, a few headers
+    and the body hash. When a request is recorded more than once the last
+    entry wins.
+    """
+
+    def __init__(self, directory: str, mode: str):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown archive mode: {mode}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._index: Dict[str, dict] = {}
+        self._index_file = None
+        index_path = self.directory / INDEX_FILE
+        if mode == "replay":
+            if not index_path.exists():
+                raise FileNotFoundError(f"No HTTP archive found in {self.directory}")
+            with index_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._index[entry["key"]] = entry
+            logger.info("Replaying %d recorded HTTP responses from %s", len(self._index), self.directory)
+        else:
+            (self.directory / BLOB_DIR).mkdir(parents=True, exist_ok=True)
+            self._index_file = index_path.open("a", encoding="utf-8")
+            logger.info("Recording HTTP responses to %s", self.directory)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.directory / BLOB_DIR / digest[:2] / f"{digest}.gz"
+
+    def _write_blob(self, content: bytes) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        if path.exists():
+            return digest
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(content, compresslevel=6))
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return digest
+
+    def record(self, method: str, url: str, kwargs: dict, response: requests.Response) -> None:
+        """Store ``response`` as the answer to this request."""
+        key = request_key(method, url, kwargs.get("params"), kwargs.get("json"), kwargs.get("data"))
+        entry = {
+            "key": key,
+            "method": method.upper(),
+            "url": response.url or url,
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers},
+            "encoding": response.encoding,
+            "body": self._write_blob(response.content),
+        }
+        with self._lock:
+            self._index_file.write(json.dumps(entry) + "\n")
+            self._index_file.flush()
+            self._index[key] = entry
+
+    def replay(self, method: str, url: str, kwargs: dict) -> requests.Response:
+        """Build the recorded response for this request.
+
+        Raises:
+            ReplayMissError: The request was not made while recording.
+        """
+        key = request_key(method, url, kwargs.get("params"), kwargs.get("json"), kwargs.get("data"))
+        entry = self._index.get(key)
+        if entry is None:
+            raise ReplayMissError(f"No recorded response for {method.upper()} {url} in {self.directory}")
+        with gzip.open(self._blob_path(entry["body"]), "rb") as f:
+            content = f.read()
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = REASONS.get(entry["status"], "")
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = entry.get("encoding")
+        response.url = entry["url"]
+        response._content = content
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            if self._index_file is not None:
+                self._index_file.close()
+                self._index_file = None
+                logger.info("Recorded %d HTTP responses to %s", len(self._index), self.directory)
+
+
+def open_archive(record: Optional[str] = None, replay: Optional[str] = None) -> Optional[HttpArchive]:
+    """Return the archive for ``--record``/``--replay``, or ``None`` for live runs."""
+    if record:
+        return HttpArchive(record, "record")
+    if replay:
+        return HttpArchive(replay, "replay")
+    return None
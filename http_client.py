@@ -0,0 +1,228 @@
+# src/http_client.py
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import run_metrics
+from http_archive import HttpArchive
+from resilience import (
+    DEFAULT_BACKOFF,
+    DEFAULT_BREAKER_COOLDOWN,
+    DEFAULT_BREAKER_THRESHOLD,
+    DEFAULT_RETRIES,
+    RETRY_STATUSES,
+    CircuitBreaker,
+    CircuitOpenError,
+    backoff_delay,
+    retry_after_delay,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 4  # matches the repo ThreadPoolExecutor in main.py
+DEFAULT_PER_HOST_LIMIT = 4
+DEFAULT_TIMEOUT = 60  # seconds
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_lock = threading.Lock()
+_sessions: Dict[str, requests.Session] = {}
+_host_limits: Dict[str, threading.BoundedSemaphore] = {}
+_settings = {
+    "pool_size": DEFAULT_POOL_SIZE,
+    "per_host_limit": DEFAULT_PER_HOST_LIMIT,
+    "timeout": DEFAULT_TIMEOUT,
+    "retries": DEFAULT_RETRIES,
+    "backoff": DEFAULT_BACKOFF,
+}
+_breaker = CircuitBreaker()
+_archive: Optional[HttpArchive] = None
+
+
+def configure(
+    pool_size: Optional[int] = None,
+    per_host_limit: Optional[int] = None,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    backoff: Optional[float] = None,
+    breaker_threshold: Optional[int] = None,
+    breaker_cooldown: Optional[float] = None,
+) -> None:
+    """Set pooling, per-host concurrency, timeout and retry behaviour.
+
+    Existing sessions are closed so the new settings apply to every host.
+    """
+    global _breaker
+    with _lock:
+        if retries is not None:
+            _settings["retries"] = max(int(retries), 0)
+        if backoff is not None:
+            _settings["backoff"] = float(backoff)
+        if breaker_threshold is not None or breaker_cooldown is not None:
+            _breaker = CircuitBreaker(
+                breaker_threshold if breaker_threshold is not None else DEFAULT_BREAKER_THRESHOLD,
+                breaker_cooldown if breaker_cooldown is not None else DEFAULT_BREAKER_COOLDOWN,
+            )
+        if pool_size is not None:
+            _settings["pool_size"] = max(int(pool_size), 1)
+        if per_host_limit is not None:
+            _settings["per_host_limit"] = max(int(per_host_limit), 1)
+        if timeout is not None:
+            _settings["timeout"] = timeout
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _host_limits.clear()
+    _breaker.reset()
+    logger.debug("HTTP client configured: %s", _settings)
+
+
+def use_archive(archive: Optional[HttpArchive]) -> None:
+    """Record responses to, or replay them from, ``archive`` (``None`` to go live)."""
+    global _archive
+    _archive = archive
+
+
+def replaying() -> bool:
+    """True when responses come from an archive instead of the network."""
+    return _archive is not None and _archive.replaying
+
+
+def _host(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def get_session(url: str) -> requests.Session:
+    """Return the shared keep-alive session for the host of ``url``."""
+    host = _host(url)
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=_settings["pool_size"],
+                pool_block=True,
+            )
+            session.mount(host, adapter)
+            session.headers["Accept-Encoding"] = "gzip, deflate"
+            _sessions[host] = session
+            logger.debug("Opened HTTP session for %s", host)
+        return session
+
+
+@contextmanager
+def _host_slot(url: str):
+    """Hold one of the concurrent request slots for the host of ``url``."""
+    host = _host(url)
+    with _lock:
+        semaphore = _host_limits.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(_settings["per_host_limit"])
+            _host_limits[host] = semaphore
+    with semaphore:
+        yield
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """Send a request through the pooled session, honouring the per-host limit.
+
+    Idempotent requests are retried on connection errors, timeouts and
+    429/5xx responses with exponential backoff and jitter, waiting at least
+    as long as ``Retry-After``/``X-RateLimit-Reset`` ask. Hosts that keep
+    failing are cut off by a circuit breaker. The last response is returned
+    when retries run out so callers still see it via ``raise_for_status``.
+
+    With an archive set by :func:`use_archive` the returned response is
+    recorded, or in replay mode served from disk without touching the
+    network.
+    """
+    if replaying():
+        started = time.perf_counter()
+        response = _archive.replay(method, url, kwargs)
+        run_metrics.record_request(url, response.status_code, len(response.content), time.perf_counter() - started)
+        return response
+    kwargs.setdefault("timeout", _settings["timeout"])
+    session = get_session(url)
+    host = _host(url)
+    retries = _settings["retries"] if method.upper() in IDEMPOTENT_METHODS else 0
+    attempt = 0
+    while True:
+        try:
+            _breaker.before_request(host)
+        except CircuitOpenError as exc:
+            if attempt >= retries:
+                raise
+            # Wait for the breaker to let a trial request through
+            delay = max(exc.retry_in, backoff_delay(attempt, _settings["backoff"]))
+            logger.warning("%s %s not sent (%s); retrying in %.1fs", method, url, exc, delay)
+            attempt += 1
+            run_metrics.record_retry()
+            time.sleep(delay)
+            continue
+        started = time.perf_counter()
+        try:
+            with _host_slot(url):
+                response = session.request(method, url, **kwargs)
+                nbytes = len(response.content)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
+            run_metrics.record_request(url, None, 0, time.perf_counter() - started)
+            _breaker.record_failure(host)
+            if attempt >= retries:
+                raise
+            delay = backoff_delay(attempt, _settings["backoff"])
+            logger.warning("%s %s failed (%s); retrying in %.1fs", method, url, exc, delay)
+        except BaseException:
+            # Never leave a half-open breaker waiting for this request
+            _breaker.record_neutral(host)
+            raise
+        else:
+            run_metrics.record_request(url, response.status_code, nbytes, time.perf_counter() - started)
+            if response.status_code not in RETRY_STATUSES:
+                _breaker.record_success(host)
+                return _recorded(method, url, kwargs, response)
+            if response.status_code == 429:
+                # Throttling is the server working as intended; 5xx is not
+                _breaker.record_neutral(host)
+            else:
+                _breaker.record_failure(host)
+            if attempt >= retries:
+                return _recorded(method, url, kwargs, response)
+            delay = backoff_delay(attempt, _settings["backoff"])
+            hinted = retry_after_delay(response.headers)
+            if hinted is not None:
+                delay = max(delay, hinted)
+            logger.warning(
+                "%s %s returned %d; retrying in %.1fs", method, url, response.status_code, delay
+            )
+            response.close()
+        attempt += 1
+        run_metrics.record_retry()
+        # Sleep outside the host slot so other requests can use it
+        time.sleep(delay)
+
+
+def _recorded(method: str, url: str, kwargs: dict, response: requests.Response) -> requests.Response:
+    if _archive is not None:
+        _archive.record(method, url, kwargs, response)
+    return response
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def close() -> None:
+    """Close all pooled sessions."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _host_limits.clear()
+    _breaker.reset()
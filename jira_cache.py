@@ -0,0 +1,100 @@
+# src/jira_cache.py
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from commit_cache import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE_HOURS = 24
+DEFAULT_SYNC_MARGIN_MINUTES = 5
+KEYS_FILE_NAME = "jira_keys.json"
+
+
+class JiraCache:
+    """Normalized Jira stories per search, with the time of the last sync.
+
+    Each JQL query gets its own JSON file, so changing the fix version or
+    the issue-type filter never reuses stale stories. ``synced_at`` is the
+    local time the last successful load *started*; anything Jira updated
+    after that is fetched again by the next run. Keys looked up one by one
+    (see ``jira_client.fetch_issues_by_keys``) share ``jira_keys.json``.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.directory = Path(cache_dir)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, jql: str) -> Path:
+        digest = hashlib.sha256(jql.encode("utf-8")).hexdigest()[:16]
+        return self.directory / f"jira_{digest}.json"
+
+    def load(self, jql: str) -> Optional[Dict[str, object]]:
+        """Return ``{"synced_at", "stories"}`` for ``jql``, or ``None``."""
+        path = self._path(jql)
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("Ignoring unreadable Jira cache %s: %s", path, exc)
+            return None
+        if data.get("jql") != jql:
+            return None
+        return {"synced_at": float(data["synced_at"]), "stories": data["stories"]}
+
+    def save(self, jql: str, stories: Dict[str, dict], synced_at: float) -> None:
+        """Replace the cached stories for ``jql`` atomically."""
+        path = self._path(jql)
+        self._write(path, {"jql": jql, "synced_at": synced_at, "stories": stories})
+        logger.debug("Saved %d Jira stories to %s", len(stories), path)
+
+    def _write(self, path: Path, data: dict) -> None:
+        fd, tmp = tempfile.mkstemp(dir=str(self.directory), prefix=path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def _read_keys(self) -> Dict[str, dict]:
+        path = self.directory / KEYS_FILE_NAME
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("Ignoring unreadable Jira cache %s: %s", path, exc)
+            return {}
+
+    def load_keys(self, keys: Iterable[str], max_age_hours: float) -> Dict[str, Optional[dict]]:
+        """Return cached lookups of individual keys fetched within ``max_age_hours``.
+
+        A ``None`` value records a key Jira did not return (deleted, or no
+        permission), so it is not looked up again until it expires.
+        """
+        entries = self._read_keys()
+        oldest = time.time() - max_age_hours * 3600
+        found = {}
+        for key in keys:
+            entry = entries.get(key)
+            if entry is not None and entry["fetched_at"] >= oldest:
+                found[key] = entry["story"]
+        return found
+
+    def save_keys(self, stories: Dict[str, Optional[dict]], fetched_at: float) -> None:
+        """Add individually looked-up keys to the cache."""
+        entries = self._read_keys()
+        for key, story in stories.items():
+            entries[key] = {"fetched_at": fetched_at, "story": story}
+        self._write(self.directory / KEYS_FILE_NAME, entries)
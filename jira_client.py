@@ -1,69 +1,131 @@
-import requests
 import os
 import logging
-from jira_token_manager import get_valid_access_token
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import http_client
+import run_metrics
+from jira_cache import DEFAULT_MAX_AGE_HOURS, DEFAULT_SYNC_MARGIN_MINUTES, JiraCache
+from jira_token_manager import get_valid_access_token, refresh_rejected_token
 
 CLOUD_ID = "aaf3ee41-766b-44b8-8b12-92b0e035861f"
-JIRA_API_BASE = f"https://api.atlassian.com/ex/jira/{CLOUD_ID}/rest/api/3"
+# Overridable so the client can be pointed at a test or benchmark server
+JIRA_API_BASE = os.getenv("JIRA_API_BASE", f"https://api.atlassian.com/ex/jira/{CLOUD_ID}/rest/api/3")
+
+DEFAULT_PAGE_WORKERS = 4
+DEFAULT_KEY_CHUNK_SIZE = 100
+STORY_FIELDS = "summary,issuetype,fixVersions,components,status"
 
 logger = logging.getLogger(__name__)
 
+def _auth_headers(token_file: str) -> dict:
+    """Request headers for Jira; no token is needed when replaying an archive."""
+    headers = {"Accept": "application/json"}
+    if not http_client.replaying():
+        headers["Authorization"] = f"Bearer {get_valid_access_token(token_file)}"
+    return headers
+
+
+def _get_search(params: dict, headers: dict):
+    """GET ``/search``; a 401 refreshes the access token once and retries.
+
+    ``headers`` is shared by every page of a search, so it is updated in
+    place and later pages go out with the new token directly.
+    """
+    response = http_client.get(f"{JIRA_API_BASE}/search", headers=headers, params=params)
+    bearer = headers.get("Authorization", "")
+    if response.status_code == 401 and bearer.startswith("Bearer "):
+        token = refresh_rejected_token(bearer[len("Bearer "):])
+        if token is not None:
+            logger.info("Jira rejected the access token; retrying with a refreshed one")
+            headers["Authorization"] = f"Bearer {token}"
+            response = http_client.get(f"{JIRA_API_BASE}/search", headers=headers, params=params)
+    return response
+
+
 def fetch_issues_by_jql(jql, token_file="jira_token.json", max_results=100):
-    token = get_valid_access_token(token_file)
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json"
-    }
-    response = requests.get(
-        f"{JIRA_API_BASE}/search",
-        headers=headers,
-        params={
+    headers = _auth_headers(token_file)
+    response = _get_search(
+        {
             "jql": jql,
             "maxResults": max_results,
             "fields": "key,summary,issuetype,fixVersions"
-        }
+        },
+        headers,
     )
     response.raise_for_status()
     return response.json()["issues"]
 
 
-def load_jira_issues(fix_version: str, token_file: str = "jira_token.json") -> dict:
-    """Load Jira issues for the given fix version via the Jira Cloud REST API."""
-    jql = (
-        f'fixVersion = "{fix_version}" '
-        'AND issuetype not in ('
-        '"Sub-task", "Tech Story", "Epic", "Test Execution", '
-        '"Dev Task", "QA Task", "Shoulder Check", "Automation ", '
-        '"Test Plan", "Spike", "Test")'
-    )
-
-    token = get_valid_access_token(token_file)
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json",
+def _search_page(
+    jql: str, headers: dict, start_at: int, max_results: int, fields: str, validate_query: Optional[str] = None
+) -> dict:
+    """Fetch a single page of Jira search results."""
+    params = {
+        "jql": jql,
+        "startAt": start_at,
+        "maxResults": max_results,
+        "fields": fields,
     }
+    if validate_query is not None:
+        params["validateQuery"] = validate_query
+    response = _get_search(params, headers)
+    response.raise_for_status()
+    return response.json()
+
+
+def _search_all(
+    jql: str,
+    headers: dict,
+    fields: str,
+    max_results: int,
+    max_workers: int,
+    checkpoint=None,
+) -> list:
+    """Return every issue matching ``jql``.
+
+    The first search page reports ``total``; the remaining ``startAt`` pages
+    are then fetched concurrently with at most ``max_workers`` in flight and
+    merged in page order. With a ``checkpoint`` every page is logged as it
+    arrives and pages logged by an interrupted run are not fetched again.
+    """
+
+    def fetch_page(start_at: int, page_size: int) -> dict:
+        if checkpoint is not None:
+            saved = checkpoint.jira_page(start_at)
+            if saved is not None:
+                return {"issues": saved["issues"], "total": saved["total"], "maxResults": saved["max_results"]}
+        data = _search_page(jql, headers, start_at, page_size, fields)
+        if checkpoint is not None:
+            checkpoint.record_jira_page(start_at, data)
+        return data
+
+    first = fetch_page(0, max_results)
+    all_issues = list(first.get("issues", []))
+    total = first.get("total", 0)
+    # Jira may cap maxResults below what we asked for; page by what it returned
+    page_size = first.get("maxResults") or max_results
+    starts = list(range(page_size, total, page_size))
+    if starts:
+        logger.debug("Fetching %d more Jira pages (%d issues total)", len(starts), total)
+        workers = max(1, min(max_workers, len(starts)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = executor.map(
+                lambda start_at: fetch_page(start_at, page_size),
+                starts,
+            )
+            # map() yields in submission order, so the merge order is fixed
+            for data in pages:
+                all_issues.extend(data.get("issues", []))
+    return all_issues
 
-    all_issues = []
-    start_at = 0
-    max_results = 100
-    while True:
-        params = {
-            "jql": jql,
-            "startAt": start_at,
-            "maxResults": max_results,
-            "fields": "summary,issuetype,fixVersions,components,status",
-        }
-        response = requests.get(f"{JIRA_API_BASE}/search", headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        all_issues.extend(data.get("issues", []))
-        if start_at + max_results >= data.get("total", 0):
-            break
-        start_at += max_results
 
+def _normalize_issues(issues: list) -> dict:
     jira_base = os.getenv("JIRA_BASE_URL", "https://csaaig.atlassian.net/browse")
     stories = {}
-    for issue in all_issues:
+    for issue in issues:
         key = issue.get("key", "").upper()
         fields = issue.get("fields", {})
         stories[key] = {
@@ -75,6 +137,123 @@ def load_jira_issues(fix_version: str, token_file: str = "jira_token.json") -> d
             "FixVersion": ", ".join(v.get("name", "") for v in fields.get("fixVersions", [])),
             "Link": f"{jira_base.rstrip('/')}/{key}",
         }
+    return stories
+
+
+def _sync_cached(
+    jql: str,
+    headers: dict,
+    cached: dict,
+    max_results: int,
+    max_workers: int,
+    margin_minutes: int,
+) -> Optional[dict]:
+    """Bring cached stories up to date, or return ``None`` to force a full load.
+
+    Only issues updated since the previous sync (plus ``margin_minutes`` for
+    clock skew) are fetched in full. Issues moved out of the search do not
+    match the updated-since query, so a key-only search of the full JQL finds
+    them. The relative ``-Nm`` form keeps the query independent of the Jira
+    user's time zone.
+    """
+    minutes = math.ceil((time.time() - cached["synced_at"]) / 60) + margin_minutes
+    changed = _search_all(
+        f"({jql}) AND updated >= -{minutes}m", headers, STORY_FIELDS, max_results, max_workers
+    )
+    keys = {
+        issue.get("key", "").upper()
+        for issue in _search_all(jql, headers, "key", max_results, max_workers)
+    }
+    stories = {key: story for key, story in cached["stories"].items() if key in keys}
+    removed = len(cached["stories"]) - len(stories)
+    stories.update(_normalize_issues(changed))
+    unknown = keys.difference(stories)
+    if unknown:
+        logger.info("%d Jira issues missing from the cache; reloading all", len(unknown))
+        return None
+    logger.info("Jira cache synced: %d changed, %d removed, %d stories", len(changed), removed, len(stories))
+    return stories
+
+
+@run_metrics.phase("load_jira_issues")
+def load_jira_issues(
+    fix_version: str,
+    token_file: str = "jira_token.json",
+    max_results: int = 100,
+    max_workers: int = DEFAULT_PAGE_WORKERS,
+    checkpoint=None,
+    cache: Optional[JiraCache] = None,
+    max_cache_age_hours: float = DEFAULT_MAX_AGE_HOURS,
+    sync_margin_minutes: int = DEFAULT_SYNC_MARGIN_MINUTES,
+) -> dict:
+    """Load Jira issues for the given fix version via the Jira Cloud REST API.
+
+    Search pages are fetched in parallel (see :func:`_search_all`). With a
+    ``cache`` that was synced less than ``max_cache_age_hours`` ago only the
+    issues updated since then are downloaded, plus a key-only search to drop
+    issues that left the fix version.
+    """
+    jql = (
+        f'fixVersion = "{fix_version}" '
+        'AND issuetype not in ('
+        '"Sub-task", "Tech Story", "Epic", "Test Execution", '
+        '"Dev Task", "QA Task", "Shoulder Check", "Automation ", '
+        '"Test Plan", "Spike", "Test")'
+    )
+
+    headers = _auth_headers(token_file)
+
+    synced_at = time.time()
+    stories = None
+    cached = cache.load(jql) if cache is not None else None
+    if cached is not None and synced_at - cached["synced_at"] < max_cache_age_hours * 3600:
+        stories = _sync_cached(jql, headers, cached, max_results, max_workers, sync_margin_minutes)
+    if stories is None:
+        issues = _search_all(jql, headers, STORY_FIELDS, max_results, max_workers, checkpoint)
+        stories = _normalize_issues(issues)
+    if cache is not None:
+        cache.save(jql, stories, synced_at)
 
     logger.info("Loaded %d Jira stories via API", len(stories))
     return stories
+
+
+def fetch_issues_by_keys(
+    keys,
+    token_file: str = "jira_token.json",
+    chunk_size: int = DEFAULT_KEY_CHUNK_SIZE,
+    max_workers: int = DEFAULT_PAGE_WORKERS,
+    cache: Optional[JiraCache] = None,
+    max_cache_age_hours: float = DEFAULT_MAX_AGE_HOURS,
+) -> dict:
+    """Look up individual issue keys, ``chunk_size`` keys per search request.
+
+    Chunks are ``key in (...)`` searches run with at most ``max_workers`` in
+    flight. ``validateQuery=warn`` makes Jira skip keys that do not exist
+    instead of rejecting the whole chunk. Returns normalized stories for the
+    keys Jira knows about; with a ``cache`` earlier lookups are reused.
+    """
+    keys = sorted(set(keys))
+    cached = cache.load_keys(keys, max_cache_age_hours) if cache is not None else {}
+    pending = [key for key in keys if key not in cached]
+    fetched = {}
+    if pending:
+        headers = _auth_headers(token_file)
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        logger.info("Looking up %d Jira keys in %d requests", len(pending), len(chunks))
+
+        def fetch_chunk(chunk):
+            jql = "key in ({})".format(", ".join(chunk))
+            return _search_page(jql, headers, 0, len(chunk), STORY_FIELDS, validate_query="warn")
+
+        fetched_at = time.time()
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+            for data in executor.map(fetch_chunk, chunks):
+                fetched.update(_normalize_issues(data.get("issues", [])))
+        # Keys Jira did not return are cached as None so they are not retried every run
+        lookups = {key: fetched.get(key) for key in pending}
+        if cache is not None:
+            cache.save_keys(lookups, fetched_at)
+    stories = {key: story for key, story in cached.items() if story is not None}
+    stories.update(fetched)
+    return stories
@@ -1,9 +1,15 @@
 import json
 import os
+import tempfile
+import threading
+import time
 from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
 import requests
 
 TOKEN_URL = "https://auth.atlassian.com/oauth/token"
+REFRESH_MARGIN_SECONDS = 300  # refresh this long before the access token expires
 
 def load_tokens(path):
     if not os.path.exists(path):
@@ -12,8 +18,17 @@ def load_tokens(path):
         return json.load(f)
 
 def save_tokens(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    """Write the token file under a temporary name and rename it into place."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".jira_token.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
 
 def _parse_created_at(token_data):
     created_at = datetime.fromisoformat(token_data.get("token_created_at"))
@@ -21,10 +36,11 @@ def _parse_created_at(token_data):
         created_at = created_at.replace(tzinfo=timezone.utc)
     return created_at
 
+def _expires_at(token_data):
+    return _parse_created_at(token_data) + timedelta(seconds=int(token_data.get("expires_in", 0)))
+
 def is_expired(token_data):
-    created_at = _parse_created_at(token_data)
-    expires_in = int(token_data.get("expires_in", 0))
-    expiry_time = created_at + timedelta(seconds=expires_in - 300)  # 5 min early
+    expiry_time = _expires_at(token_data) - timedelta(seconds=REFRESH_MARGIN_SECONDS)
     return datetime.now(timezone.utc) >= expiry_time
 
 def warn_refresh_token_expiry(token_data):
@@ -54,17 +70,106 @@ def refresh_access_token(token_data, path):
         token_data["refresh_token"] = new_tokens["refresh_token"]
     save_tokens(path, token_data)
 
-def get_valid_access_token(token_file, force_refresh=False):
-    token_data = load_tokens(token_file)
-    if "access_token" not in token_data:
-        raise ValueError("Token file missing access_token")
 
-    if force_refresh:
-        print("🔄 Force-refreshing access token...")
-        refresh_access_token(token_data, token_file)
-    elif is_expired(token_data):
+class TokenProvider:
+    """Access token of one token file, kept in memory and shared by all threads.
+
+    :meth:`token` answers from memory until the token is within
+    ``REFRESH_MARGIN_SECONDS`` of expiring. Refreshes happen under a lock, so
+    when several threads find the token stale at once one of them refreshes
+    and the others wait for and reuse its result.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = None
+        # (access_token, refresh after this epoch time), replaced as one value
+        # so the unlocked read in token() never sees a mismatched pair
+        self._current: Tuple[Optional[str], float] = (None, 0.0)
+        self._issued = set()
+
+    def _set(self, data):
+        self._data = data
+        refresh_at = _expires_at(data).timestamp() - REFRESH_MARGIN_SECONDS
+        self._current = (data["access_token"], refresh_at)
+        self._issued.add(data["access_token"])
+
+    def _load(self):
+        data = load_tokens(self.path)
+        if "access_token" not in data:
+            raise ValueError("Token file missing access_token")
+        self._set(data)
+        warn_refresh_token_expiry(data)
+
+    def _refresh(self, check_file=True):
+        if check_file:
+            # Another process may already have refreshed the file
+            on_disk = load_tokens(self.path)
+            if on_disk.get("access_token") not in self._issued and not is_expired(on_disk):
+                self._set(on_disk)
+                return
         print("🔁 Access token expired. Refreshing...")
-        refresh_access_token(token_data, token_file)
+        data = dict(self._data)
+        refresh_access_token(data, self.path)
+        self._set(data)
+        warn_refresh_token_expiry(data)
 
-    warn_refresh_token_expiry(token_data)
-    return token_data["access_token"]
+    def token(self):
+        token, refresh_at = self._current
+        if token is not None and time.time() < refresh_at:
+            return token
+        with self._lock:
+            if self._data is None:
+                self._load()
+            if time.time() >= self._current[1]:
+                self._refresh()
+            return self._current[0]
+
+    def refresh(self, rejected=None):
+        """Refresh now and return the new token.
+
+        With ``rejected`` (a token the server answered 401 to) nothing is
+        refreshed if the current token is already a different one, so
+        requests that failed together trigger a single refresh.
+        """
+        with self._lock:
+            if self._data is None:
+                self._load()
+            if rejected is not None and self._current[0] != rejected:
+                return self._current[0]
+            self._refresh(check_file=rejected is not None)
+            return self._current[0]
+
+    def issued(self, token):
+        return token in self._issued
+
+
+_providers: Dict[str, TokenProvider] = {}
+_providers_lock = threading.Lock()
+
+def get_provider(token_file):
+    """Return the process-wide :class:`TokenProvider` for ``token_file``."""
+    key = os.path.abspath(token_file)
+    with _providers_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            provider = TokenProvider(token_file)
+            _providers[key] = provider
+        return provider
+
+def refresh_rejected_token(token):
+    """Refresh the token file that issued ``token`` after a 401; ``None`` if unknown."""
+    with _providers_lock:
+        providers = list(_providers.values())
+    for provider in providers:
+        if provider.issued(token):
+            return provider.refresh(rejected=token)
+    return None
+
+def get_valid_access_token(token_file, force_refresh=False):
+    provider = get_provider(token_file)
+    if force_refresh:
+        print("🔄 Force-refreshing access token...")
+        return provider.refresh()
+    return provider.token()
@@ -0,0 +1,138 @@
+# src/local_git.py
+import logging
+import subprocess
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from commit_record import CommitRecord
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+
+# Fields are separated by US, records by NUL (git log -z)
+_LOG_FORMAT = "%H%x1f%at%x1f%B"
+
+
+def _run_git(repo_path: str, args: List[str]) -> subprocess.Popen:
+    command = ["git", "-C", str(repo_path), *args]
+    logger.debug("Running %s", " ".join(command))
+    return subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def _iter_records(stream) -> Iterator[bytes]:
+    buffer = b""
+    for chunk in iter(lambda: stream.read(65536), b""):
+        buffer += chunk
+        *records, buffer = buffer.split(b"\0")
+        yield from records
+    if buffer:
+        yield buffer
+
+
+def iter_log_pages(
+    repo_path: str,
+    revisions: List[str],
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> Iterator[List[CommitRecord]]:
+    """Yield pages of commits from ``git log`` in the Bitbucket commit shape.
+
+    Each commit is a :class:`CommitRecord` with the author timestamp in
+    milliseconds. ``start_date``/``end_date`` are applied by git
+    (``--since``/``--until``) and again on the author date, since git filters
+    by committer date.
+    """
+    args = ["log", "-z", f"--format={_LOG_FORMAT}"]
+    if start_date:
+        args.append(f"--since={start_date.isoformat()}")
+    args.extend(revisions)
+    args.append("--")
+    process = _run_git(repo_path, args)
+    page: List[CommitRecord] = []
+    finished = False
+    start_ms = start_date.timestamp() * 1000 if start_date else None
+    end_ms = end_date.timestamp() * 1000 if end_date else None
+    try:
+        for record in _iter_records(process.stdout):
+            commit_id, author_ts, message = record.decode("utf-8", "replace").split("\x1f", 2)
+            timestamp = int(author_ts) * 1000
+            if start_ms is not None and timestamp < start_ms:
+                continue
+            if end_ms is not None and timestamp > end_ms:
+                continue
+            page.append(CommitRecord(commit_id.strip(), message.rstrip("\n"), timestamp))
+            if len(page) >= page_size:
+                yield page
+                page = []
+        if page:
+            yield page
+        finished = True
+    finally:
+        if not finished:
+            # Consumer stopped early; don't wait for git to fill the pipe
+            process.kill()
+        process.stdout.close()
+        stderr = process.stderr.read().decode("utf-8", "replace")
+        process.stderr.close()
+        returncode = process.wait()
+    if finished and returncode != 0:
+        raise RuntimeError(f"git log failed in {repo_path}: {stderr.strip()}")
+
+
+def iter_commit_pages(
+    repo_path: str,
+    branch: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> Iterator[List[CommitRecord]]:
+    """Local replacement for ``bitbucket_api.iter_commit_pages``.
+
+    ``branch`` may be a branch name or any revision range accepted by
+    ``git rev-list`` (e.g. ``develop..release/r-55.0``).
+    """
+    total = 0
+    for page in iter_log_pages(repo_path, [branch], start_date, end_date, page_size):
+        total += len(page)
+        yield page
+    logger.info("Total commits read for %s branch %s: %d", repo_path, branch, total)
+
+
+def fetch_commits(
+    repo_path: str,
+    branch: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> List[CommitRecord]:
+    """Local replacement for ``bitbucket_api.fetch_commits``."""
+    commits: List[CommitRecord] = []
+    for page in iter_commit_pages(repo_path, branch, start_date, end_date):
+        commits.extend(page)
+    return commits
+
+
+def update_mirror(repo_path: str) -> None:
+    """Fetch the latest refs into a mirror clone (``git remote update --prune``)."""
+    result = subprocess.run(
+        ["git", "-C", str(repo_path), "remote", "update", "--prune"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        logger.warning("Failed to update git mirror %s: %s", repo_path, result.stderr.strip())
+    else:
+        logger.info("Updated git mirror %s", repo_path)
+
+
+def iter_compare_pages(
+    repo_path: str,
+    from_branch: str,
+    to_branch: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> Iterator[List[CommitRecord]]:
+    """Local stand-in for ``bitbucket_api.iter_compare_pages`` (``git log to..from``)."""
+    yield from iter_log_pages(repo_path, [f"{to_branch}..{from_branch}"], start_date, end_date, page_size)
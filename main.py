@@ -1,23 +1,64 @@
 import argparse
+import cProfile
 import logging
 import os
 import sys
 import subprocess
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from tqdm import tqdm
 
+import async_fetch
+import http_client
+import local_git
+import run_metrics
 from config_loader import load_config
-from bitbucket_api import fetch_commits
-from jira_client import load_jira_issues
-from commit_processor import extract_stories
+from http_archive import open_archive
+from bitbucket_api import (
+    DEFAULT_DATE_MARGIN,
+    DEFAULT_RESUME_ATTEMPTS,
+    DEFAULT_RESUME_DELAY,
+    iter_commit_pages_resumable,
+    iter_compare_pages,
+)
+from checkpoint import DEFAULT_CHECKPOINT_DIR, Checkpoint
+from commit_cache import DEFAULT_CACHE_DIR, CommitCache
+from jira_cache import DEFAULT_MAX_AGE_HOURS, JiraCache
+from jira_client import DEFAULT_KEY_CHUNK_SIZE, fetch_issues_by_keys, load_jira_issues
+from commit_processor import (
+    IN_RELEASE,
+    NOT_LOADED,
+    UNKNOWN_PROJECT,
+    WRONG_FIX_VERSION,
+    CommitMemo,
+    StoryKeyIndex,
+    StoryRef,
+    add_story_ref,
+    commit_in_window,
+    enrich_rows,
+    extract_stories,
+    merge_story_refs,
+    story_sort_key,
+)
 from excel_writer import write_excel
+from report_formats import FORMATS, parquet_available, write_report
+from pipeline import DEFAULT_QUEUE_SIZE, prefetch
+from prometheus_export import write_textfile
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_WORKERS = 4
+# Branch stats counter for each story key classification
+KEY_CLASS_STATS = {
+    IN_RELEASE: "keys_in_release",
+    WRONG_FIX_VERSION: "keys_wrong_fix_version",
+    NOT_LOADED: "keys_not_loaded",
+    UNKNOWN_PROJECT: "keys_unknown_project",
+}
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -29,6 +70,44 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--verbose", action="store_true", help="Enable debug logging")
     parser.add_argument("--dry-run", action="store_true", help="Validate setup without network calls")
     parser.add_argument("--open", action="store_true", help="Open the Excel report when done")
+    parser.add_argument(
+        "--format",
+        action="append",
+        choices=FORMATS,
+        help="Report format; repeat for several (default xlsx). "
+        "csv, jsonl and parquet write one file per app",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Ignore the on-disk commit and Jira caches")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run with the same settings from its checkpoint",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write a cProfile dump of the run next to the log file",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="Write Prometheus metrics for the run to this file (node_exporter textfile collector)",
+    )
+    archive_group = parser.add_mutually_exclusive_group()
+    archive_group.add_argument(
+        "--record",
+        metavar="DIR",
+        help="Save every Bitbucket and Jira response of the run to an archive in DIR",
+    )
+    archive_group.add_argument(
+        "--replay",
+        metavar="DIR",
+        help="Serve Bitbucket and Jira responses from an archive made with --record; no network access",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["thread", "async"],
+        help="Fetch engine: one thread per repo, or asyncio across all repos and branches",
+    )
 
     branch_group = parser.add_mutually_exclusive_group()
     branch_group.add_argument(
@@ -41,6 +120,11 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Process only the release branch",
     )
+    branch_group.add_argument(
+        "--diff",
+        action="store_true",
+        help="Only fetch commits that differ between the develop and release branches",
+    )
     return parser.parse_args()
 
 
@@ -99,53 +183,364 @@ def build_branches(args, config: Dict[str, str]) -> List[str]:
     return [develop, release]
 
 
-def process_repo(
+def load_story_index(
+    fix_version: str,
+    max_workers: int,
+    extra_projects: List[str],
+    checkpoint: Optional[Checkpoint] = None,
+    cache: Optional[JiraCache] = None,
+    max_cache_age_hours: float = DEFAULT_MAX_AGE_HOURS,
+) -> StoryKeyIndex:
+    """Load the Jira stories for ``fix_version`` and index their keys."""
+    stories = load_jira_issues(
+        fix_version,
+        max_workers=max_workers,
+        checkpoint=checkpoint,
+        cache=cache,
+        max_cache_age_hours=max_cache_age_hours,
+    )
+    return StoryKeyIndex(stories, fix_version, extra_projects)
+
+
+def enrich_unknown_stories(
+    story_index: StoryKeyIndex,
+    story_refs: Dict[str, List[StoryRef]],
+    memo: CommitMemo,
+    config: Dict[str, object],
+    cache: Optional[JiraCache],
+    max_workers: int,
+) -> None:
+    """Look up referenced keys that were not loaded and fill in their rows."""
+    unknown = [key for key in story_refs if story_index.classify(key) == NOT_LOADED]
+    if not unknown:
+        return
+    try:
+        stories = fetch_issues_by_keys(
+            unknown,
+            chunk_size=int(config.get("jira_key_chunk_size", DEFAULT_KEY_CHUNK_SIZE)),
+            max_workers=max_workers,
+            cache=cache,
+            max_cache_age_hours=float(config.get("jira_cache_max_age_hours", DEFAULT_MAX_AGE_HOURS)),
+        )
+    except Exception:
+        logger.exception("Failed to look up %d Jira keys outside the fix version", len(unknown))
+        return
+    updated = enrich_rows(memo, stories)
+    logger.info(
+        "Resolved %d of %d Jira keys outside the fix version (%d rows updated)",
+        len(stories), len(unknown), updated,
+    )
+
+
+def branch_pages(
     repo_name: str,
-    app_name: str,
+    branch: str,
     branches: List[str],
     cfg: Dict[str, str],
-    jira_story_data: Dict[str, dict],
     cutoff: datetime,
     freeze: datetime,
     auth,
     headers,
     limit: int,
+):
+    """Return the page iterator for one branch of a repository.
+
+    Repositories listed in ``git_mirrors`` are read from that local clone
+    with ``git log`` instead of the Bitbucket API. In diff mode only commits
+    on ``branch`` but not on the other branch are returned. Time spent
+    fetching and the HTTP requests made are added to the branch's run
+    metrics, and the time to the ``fetch_commits`` phase.
+    """
+    stats = run_metrics.branch(repo_name, branch)
+    pages = _branch_pages(repo_name, branch, branches, cfg, cutoff, freeze, auth, headers, limit, stats)
+    return run_metrics.timed_iter(
+        pages, stats, "fetch_seconds", histogram=("fetch_page", repo_name), phase="fetch_commits"
+    )
+
+
+def _branch_pages(repo_name, branch, branches, cfg, cutoff, freeze, auth, headers, limit, stats):
+    mirror = cfg.get("git_mirrors", {}).get(repo_name)
+    checkpoint = cfg.get("checkpoint")
+    if cfg.get("diff_mode"):
+        other = next(b for b in branches if b != branch)
+        if mirror:
+            return local_git.iter_compare_pages(mirror, branch, other, cutoff, freeze, limit)
+        return iter_compare_pages(
+            cfg["bitbucket_base_url"], repo_name, branch, other, auth, headers, limit, cutoff, freeze
+        )
+    if mirror:
+        return local_git.iter_commit_pages(mirror, branch, cutoff, freeze, limit)
+    return iter_commit_pages_resumable(
+        cfg["bitbucket_base_url"],
+        repo_name,
+        branch,
+        auth,
+        headers,
+        limit,
+        start_date=cutoff,
+        end_date=freeze,
+        windowed=cfg.get("windowed_fetch", False),
+        date_margin=cfg.get("date_margin", DEFAULT_DATE_MARGIN),
+        stats=stats,
+        cache=cfg.get("commit_cache"),
+        start=checkpoint.resume_start(repo_name, branch) if checkpoint is not None else 0,
+        resume_attempts=cfg.get("resume_attempts", DEFAULT_RESUME_ATTEMPTS),
+        resume_delay=cfg.get("resume_delay", DEFAULT_RESUME_DELAY),
+    )
+
+
+def extract_page(
+    commits: List[dict],
+    app_name: str,
+    branch: str,
+    cfg: Dict[str, str],
+    story_index: StoryKeyIndex,
+    cutoff: datetime,
+    freeze: datetime,
     develop_branch: str,
-    git_story_numbers: Dict[str, str],
-    commit_hashes: Dict[str, str],
+    story_refs: Dict[str, List[StoryRef]],
+    memo: CommitMemo,
+    entries: Optional[List[dict]] = None,
+    stats: Optional[Dict[str, float]] = None,
 ) -> List[dict]:
+    """Extract report rows from one page of commits into the ``story_refs`` shard.
+
+    If ``entries`` is given, a checkpoint entry per processed commit is
+    appended to it (see :func:`replay_checkpoint`). ``stats`` is the
+    branch's run metrics dict; it also counts the story keys per
+    classification (see :data:`KEY_CLASS_STATS`).
+    """
+    stats = stats if stats is not None else {}
     results = []
-    for branch in branches:
-        logger.info("Processing repo %s on branch %s", repo_name, branch)
-        commits = fetch_commits(
-            cfg["bitbucket_base_url"],
-            repo_name,
-            branch,
-            auth,
-            headers,
-            limit,
-            start_date=cutoff,
-            end_date=freeze,
-        )
-        for commit in tqdm(commits, desc=f"{app_name}-{branch}", leave=False):
+    key_classes = {}
+    scanned = 0
+    with run_metrics.phase("extract_stories"), run_metrics.timer(stats, "extract_seconds"):
+        for commit in commits:
+            if not commit_in_window(commit, branch, cutoff, freeze, develop_branch):
+                stats["commits_out_of_window"] = stats.get("commits_out_of_window", 0) + 1
+                continue
+            scanned += 1
+            # Commits shared with an earlier branch only gain a Commit Source
+            known = memo.seen(app_name, commit["id"], branch)
+            if known is not None:
+                for story_number in known:
+                    add_story_ref(
+                        story_refs, story_number, app_name, branch, commit["id"], commit["authorTimestamp"]
+                    )
+                if entries is not None:
+                    entries.append({"id": commit["id"], "ts": commit["authorTimestamp"], "seen": True})
+                continue
+            matched = []
             extracted = extract_stories(
                 commit=commit,
                 fix_version=cfg.get("fix_version", ""),
-                jira_story_data=jira_story_data,
+                jira_story_data=story_index.stories,
                 app_name=app_name,
                 commit_hash=commit["id"],
                 branch=branch,
                 cutoff_date_obj=cutoff,
                 code_freeze_date=freeze,
                 develop_branch=develop_branch,
-                git_story_numbers=git_story_numbers,
-                commit_hashes=commit_hashes,
+                story_refs=story_refs,
                 exclude_patterns=[],
+                story_index=story_index,
+                matched_stories=matched,
+                key_classes=key_classes,
             )
+            memo.store(app_name, commit["id"], extracted, matched)
             results.extend(extracted)
+            if entries is not None:
+                entries.append({
+                    "id": commit["id"], "ts": commit["authorTimestamp"], "stories": matched, "rows": extracted,
+                })
+    for key_class, count in key_classes.items():
+        stats[KEY_CLASS_STATS[key_class]] = stats.get(KEY_CLASS_STATS[key_class], 0) + count
+    # Only commits inside the audit window are scanned for story keys
+    stats["commits_scanned"] = stats.get("commits_scanned", 0) + scanned
+    stats["rows"] = stats.get("rows", 0) + len(results)
     return results
 
 
+def replay_checkpoint(
+    checkpoint: Checkpoint, memo: CommitMemo
+) -> Tuple[Dict[str, List[dict]], Dict[str, List[StoryRef]]]:
+    """Rebuild rows, story references and the commit memo from a checkpoint.
+
+    Extracted commits are replayed before commits that were only "seen" on
+    a second branch, so the memo has their rows regardless of which branch
+    got there first. Replay is idempotent with respect to pages that are
+    fetched again after resuming: the memo drops the duplicates.
+    """
+    all_commits: Dict[str, List[dict]] = {}
+    story_refs: Dict[str, List[StoryRef]] = {}
+    restored = checkpoint.restored_branches()
+    for _, app_name, branch, entries in restored:
+        for entry in entries:
+            if entry.get("seen"):
+                continue
+            if memo.seen(app_name, entry["id"], branch) is None:
+                memo.store(app_name, entry["id"], entry["rows"], entry["stories"])
+                all_commits.setdefault(app_name, []).extend(entry["rows"])
+            for story_number in entry["stories"]:
+                add_story_ref(story_refs, story_number, app_name, branch, entry["id"], entry["ts"])
+    for _, app_name, branch, entries in restored:
+        for entry in entries:
+            if not entry.get("seen"):
+                continue
+            for story_number in memo.seen(app_name, entry["id"], branch) or []:
+                add_story_ref(story_refs, story_number, app_name, branch, entry["id"], entry["ts"])
+    return all_commits, story_refs
+
+
+class RepoProcessingError(Exception):
+    """A repository failed part-way; carries what was extracted before that."""
+
+    def __init__(self, repo_name: str, results: List[dict], story_refs: Dict[str, List[StoryRef]]):
+        super().__init__(f"Failed processing {repo_name}")
+        self.repo_name = repo_name
+        self.results = results
+        self.story_refs = story_refs
+
+
+def process_repo(
+    repo_name: str,
+    app_name: str,
+    branches: List[str],
+    cfg: Dict[str, str],
+    jira_index: Future,
+    cutoff: datetime,
+    freeze: datetime,
+    auth,
+    headers,
+    limit: int,
+    develop_branch: str,
+    memo: CommitMemo,
+) -> Tuple[List[dict], Dict[str, List[StoryRef]]]:
+    """Fetch and extract every branch of one repository.
+
+    Returns the report rows and this worker's own story reference shard.
+
+    Raises:
+        RepoProcessingError: If a branch fails; the rows and shard collected
+            up to then are attached to it.
+    """
+    results = []
+    story_refs: Dict[str, List[StoryRef]] = {}
+    try:
+        _process_repo_branches(
+            repo_name, app_name, branches, cfg, jira_index, cutoff, freeze, auth, headers, limit,
+            develop_branch, memo, results, story_refs,
+        )
+    except Exception as exc:
+        raise RepoProcessingError(repo_name, results, story_refs) from exc
+    return results, story_refs
+
+
+def _process_repo_branches(
+    repo_name, app_name, branches, cfg, jira_index, cutoff, freeze, auth, headers, limit,
+    develop_branch, memo, results, story_refs,
+):
+    story_index = None
+    mirror = cfg.get("git_mirrors", {}).get(repo_name)
+    if mirror and cfg.get("update_git_mirrors"):
+        local_git.update_mirror(mirror)
+    checkpoint = cfg.get("checkpoint")
+    for branch in branches:
+        if checkpoint is not None and checkpoint.branch_done(repo_name, branch):
+            logger.info("Skipping repo %s branch %s; already complete in checkpoint", repo_name, branch)
+            continue
+        logger.info("Processing repo %s on branch %s", repo_name, branch)
+        pages = branch_pages(repo_name, branch, branches, cfg, cutoff, freeze, auth, headers, limit)
+        # Pages are downloaded on a background thread while earlier pages are
+        # extracted here; the bounded queue keeps memory at a few pages.
+        with tqdm(desc=f"{app_name}-{branch}", unit="commit", leave=False) as progress:
+            for commits in prefetch(pages, cfg.get("page_queue_size", DEFAULT_QUEUE_SIZE), f"{app_name}-{branch}"):
+                if story_index is None:
+                    # Jira loads concurrently with the first pages; only extraction needs it
+                    story_index = jira_index.result()
+                entries = [] if checkpoint is not None else None
+                results.extend(extract_page(
+                    commits, app_name, branch, cfg, story_index, cutoff, freeze,
+                    develop_branch, story_refs, memo, entries, run_metrics.branch(repo_name, branch),
+                ))
+                if checkpoint is not None:
+                    checkpoint.record_page(repo_name, app_name, branch, getattr(commits, "next_start", None), entries)
+                progress.update(len(commits))
+        if checkpoint is not None:
+            checkpoint.record_branch_done(repo_name, app_name, branch)
+
+
+def process_repos_async(
+    repos: Dict[str, str],
+    branches: List[str],
+    cfg: Dict[str, str],
+    jira_index: Future,
+    cutoff: datetime,
+    freeze: datetime,
+    auth,
+    headers,
+    limit: int,
+    develop_branch: str,
+    memo: CommitMemo,
+) -> Tuple[Dict[str, List[dict]], List[Dict[str, List[StoryRef]]], List[str]]:
+    """Fetch every (repo, branch) pair concurrently with the asyncio engine.
+
+    Extraction runs on the event loop thread as pages arrive. Returns the
+    rows per app, one story reference shard per (repo, branch) and the
+    repositories that failed part-way.
+    """
+    all_commits: Dict[str, List[dict]] = {}
+    shards: Dict[tuple, Dict[str, List[StoryRef]]] = {}
+    jobs = {}
+    checkpoint = cfg.get("checkpoint")
+    for repo_name, app_name in repos.items():
+        mirror = cfg.get("git_mirrors", {}).get(repo_name)
+        if mirror and cfg.get("update_git_mirrors"):
+            local_git.update_mirror(mirror)
+        for branch in branches:
+            if checkpoint is not None and checkpoint.branch_done(repo_name, branch):
+                logger.info("Skipping repo %s branch %s; already complete in checkpoint", repo_name, branch)
+                continue
+            jobs[(repo_name, app_name, branch)] = branch_pages(
+                repo_name, branch, branches, cfg, cutoff, freeze, auth, headers, limit
+            )
+
+    with tqdm(desc="Commits", unit="commit") as progress:
+        def on_page(key, commits):
+            repo_name, app_name, branch = key
+            entries = [] if checkpoint is not None else None
+            rows = extract_page(
+                commits, app_name, branch, cfg, jira_index.result(), cutoff, freeze,
+                develop_branch, shards.setdefault(key, {}), memo, entries,
+                run_metrics.branch(repo_name, branch),
+            )
+            if checkpoint is not None:
+                checkpoint.record_page(repo_name, app_name, branch, getattr(commits, "next_start", None), entries)
+            if rows:
+                all_commits.setdefault(app_name, []).extend(rows)
+            progress.update(len(commits))
+
+        errors = async_fetch.fetch_all(
+            jobs,
+            on_page,
+            concurrency=cfg.get("async_concurrency", async_fetch.DEFAULT_CONCURRENCY),
+            timeout=cfg.get("async_page_timeout", async_fetch.DEFAULT_PAGE_TIMEOUT),
+            ready=jira_index,
+        )
+    failed = []
+    for (repo_name, app_name, branch), error in errors.items():
+        if error is not None:
+            logger.error(
+                "Failed processing %s branch %s; its results are incomplete",
+                repo_name, branch, exc_info=error,
+            )
+            if repo_name not in failed:
+                failed.append(repo_name)
+        elif checkpoint is not None:
+            checkpoint.record_branch_done(repo_name, app_name, branch)
+    return all_commits, [shards[key] for key in jobs if key in shards], failed
+
+
 def main() -> None:
     args = parse_args()
 
@@ -161,12 +556,62 @@ def main() -> None:
         handlers=[logging.FileHandler(log_file), logging.StreamHandler(sys.stdout)],
     )
 
+    metrics = run_metrics.reset()
+    run_info: Dict[str, object] = {"metrics_textfile": args.metrics_file}
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    success = False
+    archive = None
+    try:
+        archive = open_archive(args.record, args.replay)
+        http_client.use_archive(archive)
+        with run_metrics.phase("total"):
+            run_audit(args, log_file, output_dir, run_info)
+        success = True
+    finally:
+        if archive is not None:
+            http_client.use_archive(None)
+            archive.close()
+        if profiler is not None:
+            profiler.disable()
+            profile_file = log_file.with_suffix(".prof")
+            profiler.dump_stats(str(profile_file))
+            logger.info("Profile written to %s (view with: python -m pstats %s)", profile_file, profile_file)
+        run_metrics.write_summary(log_file.with_suffix(".summary.json"))
+        if run_info.get("metrics_textfile"):
+            try:
+                write_textfile(
+                    run_info["metrics_textfile"], metrics, success, {"fix_version": run_info.get("fix_version", "")}
+                )
+            except OSError:
+                logger.exception("Failed to write Prometheus metrics to %s", run_info["metrics_textfile"])
+
+
+def run_audit(args: argparse.Namespace, log_file: Path, output_dir: Path, run_info: Dict[str, object]) -> None:
+    """Load configuration, fetch and extract every repository and write the reports.
+
+    ``run_info`` receives the settings :func:`main` needs after the run.
+    """
     logger.info("Loading configuration...")
     config_path = Path(args.config)
     config = load_config(str(config_path))
+    run_info["metrics_textfile"] = run_info.get("metrics_textfile") or config.get("metrics_textfile")
+    run_info["fix_version"] = config.get("fix_version", "")
+
+    formats = list(dict.fromkeys(args.format or config.get("report_formats", ["xlsx"])))
+    if "parquet" in formats and not parquet_available():
+        logger.error("Parquet output needs pyarrow; install it with 'pip install pyarrow'")
+        # Fail the run so schedulers and the metrics textfile don't record a success
+        raise SystemExit(1)
 
     env_path = config_path.resolve().parent / ".env"
-    bitbucket_email, bitbucket_token = ensure_credentials(env_path)
+    if args.replay:
+        # Recorded responses need no credentials
+        bitbucket_email = os.getenv("BITBUCKET_EMAIL", "")
+        bitbucket_token = os.getenv("BITBUCKET_TOKEN", "")
+    else:
+        bitbucket_email, bitbucket_token = ensure_credentials(env_path)
 
     if args.dry_run:
         logger.info("Dry run successful. Configuration and environment look good")
@@ -185,74 +630,226 @@ def main() -> None:
     commit_limit = int(config.get("commit_fetch_limit", 100))
     cutoff_days = int(config.get("cutoff_days_before_code_freeze", 28))
     freeze_days = int(config.get("code_freeze_days_before_release", 17))
+    windowed_fetch = bool(config.get("windowed_fetch", False))
+    date_margin = timedelta(days=int(config.get("fetch_date_margin_days", DEFAULT_DATE_MARGIN.days)))
 
     release_date = datetime.strptime(fix_version.replace("Mobilitas ", ""), "%Y.%m.%d") if fix_version else datetime.now()
     code_freeze_date = release_date - timedelta(days=freeze_days)
     cutoff_date = code_freeze_date - timedelta(days=cutoff_days)
 
-    logger.info("Loading Jira stories via API...")
-    jira_story_data = load_jira_issues(fix_version)
+    max_workers = int(config.get("max_workers", DEFAULT_MAX_WORKERS))
+    engine = args.engine or config.get("fetch_engine", "thread")
+    async_concurrency = int(config.get("async_concurrency", async_fetch.DEFAULT_CONCURRENCY))
+    # The async engine keeps up to async_concurrency page requests to one host in flight
+    host_concurrency = max(max_workers, async_concurrency) if engine == "async" else max_workers
+    http_client.configure(
+        pool_size=int(config.get("http_pool_size", host_concurrency)),
+        per_host_limit=int(config.get("http_per_host_limit", host_concurrency)),
+        timeout=config.get("http_timeout", http_client.DEFAULT_TIMEOUT),
+        retries=config.get("http_retries"),
+        backoff=config.get("http_backoff_seconds"),
+        breaker_threshold=config.get("circuit_breaker_threshold"),
+        breaker_cooldown=config.get("circuit_breaker_cooldown_seconds"),
+    )
+
+    # Caches, checkpoints and local mirrors would skip requests, leaving gaps in
+    # a recording and answers in a replay that did not come from the archive
+    archived = bool(args.record or args.replay)
+    if archived:
+        logger.info("Commit/Jira caches, checkpoints and git mirrors are off while recording or replaying")
+    commit_cache = None
+    if not args.no_cache and not archived and config.get("commit_cache", True):
+        commit_cache = CommitCache(config.get("commit_cache_dir", DEFAULT_CACHE_DIR))
+    jira_cache = None
+    if not args.no_cache and not archived and config.get("jira_cache", True):
+        jira_cache = JiraCache(config.get("commit_cache_dir", DEFAULT_CACHE_DIR))
 
     auth = (bitbucket_email, bitbucket_token)
     headers = {"Accept": "application/json"}
 
     all_commits: Dict[str, List[dict]] = {}
-    git_story_numbers: Dict[str, str] = {}
-    commit_hashes: Dict[str, str] = {}
-    logger.info("Processing repositories...")
-    with ThreadPoolExecutor(max_workers=4) as executor, tqdm(total=len(repos), desc="Repos") as progress:
-        futures = {}
-        for repo_name, app_name in repos.items():
-            futures[executor.submit(
-                process_repo,
-                repo_name,
-                app_name,
+    shards: List[Dict[str, List[StoryRef]]] = []
+    memo = CommitMemo()
+    failed_repos: List[str] = []
+
+    checkpoint = None
+    if config.get("checkpoints", True) and not archived:
+        checkpoint = Checkpoint.for_run(
+            {
+                "fix_version": fix_version,
+                "repos": repos,
+                "branches": branches,
+                "diff": args.diff,
+                "cutoff": cutoff_date,
+                "freeze": code_freeze_date,
+            },
+            config.get("checkpoint_dir", DEFAULT_CHECKPOINT_DIR),
+            resume=args.resume,
+        )
+        restored_commits, restored_refs = replay_checkpoint(checkpoint, memo)
+        for app_name, rows in restored_commits.items():
+            all_commits.setdefault(app_name, []).extend(rows)
+        shards.append(restored_refs)
+
+    if args.diff:
+        logger.info(
+            "Diff mode: only commits on one of %s/%s but not the other are scanned; "
+            "the missing stories comparison is skipped",
+            develop_branch, release_branch,
+        )
+    repo_cfg = {
+        "bitbucket_base_url": base_url,
+        "fix_version": fix_version,
+        "windowed_fetch": windowed_fetch,
+        "date_margin": date_margin,
+        "commit_cache": commit_cache,
+        "page_queue_size": int(config.get("page_queue_size", DEFAULT_QUEUE_SIZE)),
+        "diff_mode": args.diff,
+        "git_mirrors": {} if archived else config.get("git_mirrors", {}),
+        "update_git_mirrors": bool(config.get("update_git_mirrors", False)),
+        "async_concurrency": async_concurrency,
+        "async_page_timeout": float(config.get("async_page_timeout", async_fetch.DEFAULT_PAGE_TIMEOUT)),
+        # A response missing from a replay archive will not turn up on a retry
+        "resume_attempts": 0 if args.replay else int(config.get("branch_resume_attempts", DEFAULT_RESUME_ATTEMPTS)),
+        "resume_delay": float(config.get("circuit_breaker_cooldown_seconds", DEFAULT_RESUME_DELAY)),
+        "checkpoint": checkpoint,
+    }
+    logger.info("Loading Jira stories via API and processing repositories...")
+    with run_metrics.phase("fetch_and_extract"), ThreadPoolExecutor(max_workers=1) as jira_executor:
+        jira_future = jira_executor.submit(
+            load_story_index,
+            fix_version,
+            max_workers,
+            config.get("jira_projects", []),
+            checkpoint,
+            jira_cache,
+            float(config.get("jira_cache_max_age_hours", DEFAULT_MAX_AGE_HOURS)),
+        )
+        if engine == "async":
+            async_commits, async_shards, failed_repos = process_repos_async(
+                repos,
                 branches,
-                {
-                    "bitbucket_base_url": base_url,
-                    "fix_version": fix_version,
-                },
-                jira_story_data,
+                repo_cfg,
+                jira_future,
                 cutoff_date,
                 code_freeze_date,
                 auth,
                 headers,
                 commit_limit,
                 develop_branch,
-                git_story_numbers,
-                commit_hashes,
-            )] = (repo_name, app_name)
-
-        for future in as_completed(futures):
-            repo_name, app_name = futures[future]
-            progress.set_description(f"{repo_name}")
-            progress.update(1)
-            try:
-                commits = future.result()
-                if commits:
-                    all_commits.setdefault(app_name, []).extend(commits)
-            except Exception:
-                logger.exception("Failed processing %s", repo_name)
-
-    missing = []
-    for story in tqdm(jira_story_data, desc="Jira compare", leave=False):
-        if story not in git_story_numbers:
-            missing.append(story)
-    missing_data = [jira_story_data[s] | {"Missing From": "Git", "Notes": ""} for s in missing]
+                memo,
+            )
+            for app_name, commits in async_commits.items():
+                all_commits.setdefault(app_name, []).extend(commits)
+            shards.extend(async_shards)
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+                    tqdm(total=len(repos), desc="Repos") as progress:
+                futures = {}
+                for repo_name, app_name in repos.items():
+                    futures[executor.submit(
+                        process_repo,
+                        repo_name,
+                        app_name,
+                        branches,
+                        repo_cfg,
+                        jira_future,
+                        cutoff_date,
+                        code_freeze_date,
+                        auth,
+                        headers,
+                        commit_limit,
+                        develop_branch,
+                        memo,
+                    )] = (repo_name, app_name)
+
+                for future in as_completed(futures):
+                    repo_name, app_name = futures[future]
+                    progress.set_description(f"{repo_name}")
+                    progress.update(1)
+                    try:
+                        commits, story_refs = future.result()
+                    except RepoProcessingError as exc:
+                        logger.error(
+                            "Failed processing %s; its results are incomplete", repo_name, exc_info=exc.__cause__
+                        )
+                        commits, story_refs = exc.results, exc.story_refs
+                        failed_repos.append(repo_name)
+                    if commits:
+                        all_commits.setdefault(app_name, []).extend(commits)
+                    shards.append(story_refs)
+
+        story_index = jira_future.result()
+        jira_story_data = story_index.stories
+
+    story_refs = merge_story_refs(shards)
+    if config.get("enrich_unknown_keys", True):
+        with run_metrics.phase("enrich_unknown_keys"):
+            enrich_unknown_stories(story_index, story_refs, memo, config, jira_cache, max_workers)
+
+    if commit_cache is not None:
+        commit_cache.close()
+    if checkpoint is not None:
+        checkpoint.close()
+    http_client.close()
+
+    if args.diff:
+        # Stories whose commits are on both branches are not in the diff at all,
+        # so comparing against the Jira stories would report them as missing
+        missing = []
+    else:
+        missing = sorted(jira_story_data.keys() - story_refs.keys(), key=story_sort_key)
+    multi_commit = sum(1 for refs in story_refs.values() if len({ref.commit_hash for ref in refs}) > 1)
+    logger.info("%d stories referenced by commits (%d by more than one commit)", len(story_refs), multi_commit)
+    notes = ""
+    if failed_repos and missing:
+        # Their stories may just be in the commits that were never fetched
+        notes = "Git data incomplete: failed to process " + ", ".join(sorted(failed_repos))
+        logger.warning("%d missing stories are unverified; %s", len(missing), notes)
+    missing_data = [jira_story_data[s] | {"Missing From": "Git", "Notes": notes} for s in missing]
+    run_metrics.increment("jira_stories", len(jira_story_data))
+    run_metrics.increment("stories_matched", len(story_refs))
+    if not args.diff:
+        run_metrics.increment("missing_stories", len(missing))
+    run_metrics.increment("report_rows", sum(len(rows) for rows in all_commits.values()))
+    key_counts = {
+        key_class: sum(stats.get(counter, 0) for stats in run_metrics.current().branches.values())
+        for key_class, counter in KEY_CLASS_STATS.items()
+    }
+    logger.info(
+        "Story keys in commit messages: %s",
+        ", ".join(f"{count} {key_class}" for key_class, count in key_counts.items()),
+    )
+    for key_class, counter in KEY_CLASS_STATS.items():
+        run_metrics.increment(counter, key_counts[key_class])
 
     timestamp = datetime.now().strftime("%Y%m%d-%H%M")
-    output_file = output_dir / f"gitxjira_report_{timestamp}.xlsx"
-    with tqdm(total=1, desc="Writing Excel", leave=False):
-        write_excel(all_commits, missing_data, str(output_file))
-        tqdm.write("Excel report generated")
-    logger.info("Report written to %s", output_file)
+    outputs = []
+    for fmt in formats:
+        if fmt == "xlsx":
+            output_file = output_dir / f"gitxjira_report_{timestamp}.xlsx"
+            with tqdm(total=1, desc="Writing Excel", leave=False):
+                write_excel(all_commits, missing_data, str(output_file))
+                tqdm.write("Excel report generated")
+        else:
+            output_file = write_report(
+                all_commits, missing_data, output_dir / f"gitxjira_report_{timestamp}_{fmt}", fmt
+            )
+        logger.info("Report written to %s", output_file)
+        outputs.append(output_file)
+    if checkpoint is not None:
+        if all(checkpoint.branch_done(repo_name, branch) for repo_name in repos for branch in branches):
+            checkpoint.discard()
+        else:
+            logger.warning("Some branches failed; rerun with --resume to continue from %s", checkpoint.directory)
     logger.info("Log file written to %s", log_file)
 
-    print("\nReport saved to", output_file)
+    for output_file in outputs:
+        print("\nReport saved to", output_file)
     print("Log file:", log_file)
 
     if args.open:
-        open_file(output_file)
+        open_file(outputs[0])
 
 
 if __name__ == "__main__":
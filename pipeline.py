@@ -0,0 +1,65 @@
+# src/pipeline.py
+import logging
+import queue
+import threading
+from typing import Iterable, Iterator, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_QUEUE_SIZE = 4  # pages buffered ahead of the consumer
+
+_DONE = object()
+
+
+class _Failure:
+    __slots__ = ("exc",)
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def prefetch(items: Iterable[T], maxsize: int = DEFAULT_QUEUE_SIZE, name: str = "prefetch") -> Iterator[T]:
+    """Iterate ``items`` on a background thread, buffering at most ``maxsize``.
+
+    The producer blocks once the queue is full, so a slow consumer applies
+    backpressure and memory stays bounded by ``maxsize`` items. Exceptions
+    raised by the producer are re-raised in the consumer. Closing the
+    returned iterator early stops the producer after its current item.
+    """
+    buffer: "queue.Queue" = queue.Queue(maxsize=max(int(maxsize), 1))
+    stop = threading.Event()
+
+    def _put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce() -> None:
+        try:
+            for item in items:
+                if not _put(item):
+                    return
+        except BaseException as exc:  # propagated to the consumer
+            _put(_Failure(exc))
+            return
+        _put(_DONE)
+
+    worker = threading.Thread(target=_produce, name=name, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+        worker.join()
@@ -0,0 +1,134 @@
+# src/prometheus_export.py
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from run_metrics import LATENCY_BUCKETS, RunMetrics
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "release_audit"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+class _Exposition:
+    def __init__(self, common: Dict[str, str]):
+        self.common = common
+        self.lines: List[str] = []
+        self._declared = set()
+
+    def declare(self, name: str, kind: str, help_text: str) -> None:
+        if name not in self._declared:
+            self._declared.add(name)
+            self.lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            self.lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+    def sample(self, name: str, value: float, **labels: str) -> None:
+        self.lines.append(f"{PREFIX}_{name}{_labels({**self.common, **labels})} {_number(value)}")
+
+    def gauge(self, name: str, help_text: str, value: float, **labels: str) -> None:
+        self.declare(name, "gauge", help_text)
+        self.sample(name, value, **labels)
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def render(metrics: RunMetrics, success: bool, common_labels: Optional[Dict[str, str]] = None) -> str:
+    """Render the metrics of one run in the Prometheus text exposition format.
+
+    Every value describes the last run, so counts are exported as gauges
+    and alerting rules can compare one run with the next.
+    """
+    out = _Exposition(common_labels or {})
+    summary = metrics.summary()
+    out.gauge("last_run_success", "1 if the last audit run completed, 0 if it failed.", int(success))
+    out.gauge("last_run_timestamp_seconds", "Unix time the last audit run finished.", time.time())
+    out.gauge("run_duration_seconds", "Wall time of the last audit run.", summary["duration_seconds"])
+
+    for phase, values in summary["phases"].items():
+        out.gauge("phase_duration_seconds", "Wall time per phase, summed across threads.",
+                  values["seconds"], phase=phase)
+
+    http = summary["http"]
+    out.gauge("http_retries", "HTTP requests retried during the last run.", http["retries"])
+    for host, values in http["hosts"].items():
+        out.gauge("http_requests", "HTTP request attempts during the last run.", values["requests"], host=host)
+    for host, values in http["hosts"].items():
+        out.gauge("http_errors", "HTTP attempts that failed or returned 4xx/5xx.", values["errors"], host=host)
+    for host, values in http["hosts"].items():
+        out.gauge("http_received_bytes", "HTTP response body bytes received.", values["bytes_received"], host=host)
+
+    per_repo: Dict[str, Dict[str, float]] = {}
+    for branch in summary["branches"]:
+        repo = per_repo.setdefault(branch["repo"], {})
+        for key in ("commits_scanned", "pages_fetched", "requests", "commits_filtered", "rows"):
+            repo[key] = repo.get(key, 0) + branch.get(key, 0)
+    for name, key, help_text in (
+        ("commits_scanned", "commits_scanned", "Commits inside the audit window that were scanned for story keys."),
+        ("pages_fetched", "pages_fetched", "Commit pages requested from Bitbucket."),
+        ("fetch_requests", "requests", "HTTP requests made to fetch the repository's commits, including retries."),
+        ("commits_filtered", "commits_filtered", "Fetched commits dropped because they are outside the date window."),
+        ("rows", "rows", "Report rows produced."),
+    ):
+        for repo, values in sorted(per_repo.items()):
+            out.gauge(name, help_text, values[key], repo=repo)
+
+    counters = summary["counters"]
+    for key, help_text in (
+        ("jira_stories", "Jira stories loaded for the fix version."),
+        ("stories_matched", "Stories referenced by at least one commit."),
+        ("missing_stories", "Jira stories not referenced by any commit."),
+    ):
+        if key in counters:
+            out.gauge(key, help_text, counters[key])
+
+    for (name, label), histogram in sorted(metrics.histogram_snapshot().items()):
+        metric = f"{name}_duration_seconds"
+        out.declare(metric, "histogram", f"Latency of {name.replace('_', ' ')} requests per repository.")
+        for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+            out.sample(f"{metric}_bucket", count, repo=label, le=repr(bound))
+        out.sample(f"{metric}_bucket", histogram["count"], repo=label, le="+Inf")
+        out.sample(f"{metric}_sum", histogram["sum"], repo=label)
+        out.sample(f"{metric}_count", histogram["count"], repo=label)
+    return out.text()
+
+
+def write_textfile(
+    path: str, metrics: RunMetrics, success: bool, common_labels: Optional[Dict[str, str]] = None
+) -> None:
+    """Write the run metrics to ``path`` for the node_exporter textfile collector.
+
+    The file is written under a temporary name in the same directory and
+    renamed into place, so the collector never reads a half-written file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(render(metrics, success, common_labels))
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    logger.info("Prometheus metrics written to %s", path)
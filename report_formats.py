@@ -0,0 +1,124 @@
+# src/report_formats.py
+import csv
+import json
+import logging
+import re
+from pathlib import Path
+
+import run_metrics
+from excel_writer import status_after_app
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("xlsx", "csv", "jsonl", "parquet")
+MISSING_STORIES_NAME = "missing_jira_stories"
+PARQUET_BATCH_SIZE = 10000
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _file_stem(name):
+    return re.sub(r"[^\w.-]+", "_", name).strip("_") or "report"
+
+
+def write_csv(rows, path, reorder=None):
+    """Stream dict ``rows`` to a CSV file; returns the row count."""
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = None
+        for row in rows:
+            if writer is None:
+                columns = list(row)
+                if reorder is not None:
+                    columns = reorder(columns)
+                writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+                writer.writeheader()
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_jsonl(rows, path, reorder=None):
+    """Stream dict ``rows`` to a JSON Lines file; returns the row count."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            if reorder is not None:
+                row = {column: row[column] for column in reorder(list(row))}
+            f.write(json.dumps(row, ensure_ascii=False, default=str))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def write_parquet(rows, path, reorder=None, batch_size=PARQUET_BATCH_SIZE):
+    """Write dict ``rows`` to Parquet in record batches; returns the row count.
+
+    Every column is stored as a nullable string, like the spreadsheet cells.
+    Needs ``pyarrow``.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    count = 0
+    writer = None
+    columns = None
+    batch = []
+
+    def flush():
+        table = pa.Table.from_pydict(
+            {column: [None if row.get(column) is None else str(row.get(column)) for row in batch]
+             for column in columns},
+            schema=writer.schema,
+        )
+        writer.write_table(table)
+        batch.clear()
+
+    try:
+        for row in rows:
+            if writer is None:
+                columns = list(row)
+                if reorder is not None:
+                    columns = reorder(columns)
+                schema = pa.schema([(column, pa.string()) for column in columns])
+                writer = pq.ParquetWriter(str(path), schema)
+            batch.append(row)
+            count += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+WRITERS = {"csv": write_csv, "jsonl": write_jsonl, "parquet": write_parquet}
+
+
+@run_metrics.phase("write_report")
+def write_report(all_commits, missing_stories_data, directory, fmt):
+    """Write one ``fmt`` file per app plus one for the missing stories.
+
+    Returns the directory the files were written to.
+    """
+    writer = WRITERS[fmt]
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for app_name, commits in all_commits.items():
+        count = writer(commits, directory / f"{_file_stem(app_name)}.{fmt}")
+        logger.info("Exported %s with %d commits to %s", app_name, count, fmt)
+    if missing_stories_data:
+        writer(
+            missing_stories_data,
+            directory / f"{MISSING_STORIES_NAME}.{fmt}",
+            reorder=status_after_app,
+        )
+    return directory
@@ -0,0 +1,129 @@
+# src/resilience.py
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRIES = 5
+DEFAULT_BACKOFF = 1.0  # seconds, doubled per attempt
+DEFAULT_MAX_BACKOFF = 60.0
+MAX_RETRY_AFTER = 300.0  # never sleep longer than this on a server hint
+DEFAULT_BREAKER_THRESHOLD = 5  # consecutive failures before a host is cut off
+DEFAULT_BREAKER_COOLDOWN = 60.0  # seconds before a trial request is let through
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request to a host whose breaker is open.
+
+    ``retry_in`` is how many seconds remain until a trial request is allowed
+    (0 while another caller's trial request is in flight).
+    """
+
+    def __init__(self, *args, retry_in: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retry_in = retry_in
+
+
+def backoff_delay(attempt: int, base: float = DEFAULT_BACKOFF, cap: float = DEFAULT_MAX_BACKOFF) -> float:
+    """Exponential backoff with full jitter for the given 0-based attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after_delay(headers: Mapping[str, str]) -> Optional[float]:
+    """Return the delay requested by the server, if any.
+
+    Understands ``Retry-After`` (seconds or an HTTP date) and Atlassian's
+    ``X-RateLimit-Reset`` (an ISO 8601 timestamp).
+    """
+    now = datetime.now(timezone.utc)
+    value = headers.get("Retry-After")
+    if value:
+        value = value.strip()
+        if value.isdigit():
+            return min(float(value), MAX_RETRY_AFTER)
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            when = None
+        if when is not None:
+            if when.tzinfo is None:
+                when = when.replace(tzinfo=timezone.utc)
+            return min(max((when - now).total_seconds(), 0.0), MAX_RETRY_AFTER)
+    reset = headers.get("X-RateLimit-Reset")
+    if reset:
+        try:
+            when = datetime.fromisoformat(reset.strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return min(max((when - now).total_seconds(), 0.0), MAX_RETRY_AFTER)
+    return None
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker.
+
+    After ``threshold`` consecutive failures a host is "open" and requests
+    fail fast with :class:`CircuitOpenError` for ``cooldown`` seconds. After
+    that a single trial request is allowed; success closes the breaker,
+    failure opens it again and a neutral outcome (such as a 429) lets the
+    next request be the trial.
+    """
+
+    def __init__(self, threshold: int = DEFAULT_BREAKER_THRESHOLD, cooldown: float = DEFAULT_BREAKER_COOLDOWN):
+        self.threshold = max(int(threshold), 1)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._trial: Dict[str, bool] = {}
+
+    def before_request(self, host: str) -> None:
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return
+            remaining = self.cooldown - (time.monotonic() - opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(f"Circuit breaker open for {host}", retry_in=remaining)
+            if self._trial.get(host):
+                raise CircuitOpenError(f"Circuit breaker open for {host}; trial request in flight")
+            self._trial[host] = True
+            logger.info("Circuit breaker for %s half-open; sending a trial request", host)
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            if self._opened_at.pop(host, None) is not None:
+                logger.info("Circuit breaker for %s closed", host)
+            self._failures[host] = 0
+            self._trial.pop(host, None)
+
+    def record_failure(self, host: str) -> None:
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if self._trial.pop(host, False) or failures >= self.threshold:
+                if host not in self._opened_at:
+                    logger.warning("Circuit breaker for %s opened after %d failures", host, failures)
+                self._opened_at[host] = time.monotonic()
+
+    def record_neutral(self, host: str) -> None:
+        """End a request that neither proves nor disproves the host is healthy."""
+        with self._lock:
+            self._trial.pop(host, None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures.clear()
+            self._opened_at.clear()
+            self._trial.clear()
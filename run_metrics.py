@@ -0,0 +1,223 @@
+# src/run_metrics.py
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Upper bounds (seconds) of the page fetch latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Branch counters that HTTP requests on this thread are attributed to (see timed_iter)
+_local = threading.local()
+
+
+def _rounded(counters: Dict[str, float]) -> Dict[str, float]:
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in counters.items()}
+
+
+class RunMetrics:
+    """Timings and counters collected during one audit run.
+
+    ``phases`` accumulate wall time per named step (summed across threads
+    for steps that run concurrently, such as extraction). ``branches`` hold
+    one counter dict per (repo, branch) that the fetch and extraction code
+    update in place. HTTP counters are fed by :mod:`http_client`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.branches: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.http: Dict[str, float] = {
+            "requests": 0, "errors": 0, "retries": 0, "bytes_received": 0, "seconds": 0.0,
+        }
+        self.http_hosts: Dict[str, Dict[str, float]] = {}
+        self.http_statuses: Dict[str, int] = {}
+        self.histograms: Dict[Tuple[str, str], Dict[str, object]] = {}
+
+    def add_phase_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            phase = self.phases.setdefault(name, {"seconds": 0.0, "calls": 0})
+            phase["seconds"] += seconds
+            phase["calls"] += 1
+
+    def branch(self, repo: str, branch: str) -> Dict[str, float]:
+        """Return the counter dict for ``repo``/``branch``, creating it if needed."""
+        with self._lock:
+            return self.branches.setdefault((repo, branch), {})
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, label: str, seconds: float) -> None:
+        """Add ``seconds`` to the ``name`` latency histogram for ``label``."""
+        with self._lock:
+            histogram = self.histograms.get((name, label))
+            if histogram is None:
+                histogram = {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+                self.histograms[(name, label)] = histogram
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def record_request(self, url: str, status: Optional[int], nbytes: int, seconds: float) -> None:
+        """Count one HTTP attempt; ``status`` is ``None`` when no response arrived."""
+        host = urlsplit(url).netloc
+        failed = status is None or status >= 400
+        branch_counters = getattr(_local, "counters", None)
+        with self._lock:
+            if branch_counters is not None:
+                branch_counters["requests"] = branch_counters.get("requests", 0) + 1
+            host_counters = self.http_hosts.setdefault(
+                host, {"requests": 0, "errors": 0, "bytes_received": 0, "seconds": 0.0}
+            )
+            for counters in (self.http, host_counters):
+                counters["requests"] += 1
+                counters["bytes_received"] += nbytes
+                counters["seconds"] += seconds
+                if failed:
+                    counters["errors"] += 1
+            key = str(status) if status is not None else "connection_error"
+            self.http_statuses[key] = self.http_statuses.get(key, 0) + 1
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.http["retries"] += 1
+
+    def histogram_snapshot(self) -> Dict[Tuple[str, str], Dict[str, object]]:
+        with self._lock:
+            return {key: dict(value, buckets=list(value["buckets"])) for key, value in self.histograms.items()}
+
+    def summary(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+                "duration_seconds": round(time.time() - self.started, 3),
+                "phases": {name: _rounded(phase) for name, phase in self.phases.items()},
+                "http": dict(
+                    _rounded(self.http),
+                    hosts={host: _rounded(counters) for host, counters in self.http_hosts.items()},
+                    statuses=dict(self.http_statuses),
+                ),
+                "counters": dict(self.counters),
+                "branches": [
+                    {"repo": repo, "branch": branch, **_rounded(counters)}
+                    for (repo, branch), counters in sorted(self.branches.items())
+                ],
+            }
+
+
+_current = RunMetrics()
+
+
+def current() -> RunMetrics:
+    return _current
+
+
+def reset() -> RunMetrics:
+    """Start collecting for a new run."""
+    global _current
+    _current = RunMetrics()
+    return _current
+
+
+@contextmanager
+def phase(name: str):
+    """Time a block (or, used as a decorator, a function) as phase ``name``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current.add_phase_time(name, time.perf_counter() - started)
+
+
+@contextmanager
+def timer(counters: Dict[str, float], key: str):
+    """Add the wall time of a block to ``counters[key]``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        counters[key] = counters.get(key, 0.0) + time.perf_counter() - started
+
+
+def timed_iter(
+    items: Iterable[T],
+    counters: Dict[str, float],
+    key: str,
+    histogram: Optional[Tuple[str, str]] = None,
+    phase: Optional[str] = None,
+) -> Iterator[T]:
+    """Yield from ``items``, adding the time spent producing them to ``counters[key]``.
+
+    HTTP requests made while producing an item are counted in
+    ``counters["requests"]``. With ``histogram`` (``(name, label)``) the time
+    per item is also observed in that latency histogram, and with ``phase``
+    the total time is added to that phase once the iterator is done.
+    """
+    iterator = iter(items)
+    total = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            previous = getattr(_local, "counters", None)
+            _local.counters = counters
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _local.counters = previous
+                elapsed = time.perf_counter() - started
+                total += elapsed
+                counters[key] = counters.get(key, 0.0) + elapsed
+            if histogram is not None:
+                _current.observe(histogram[0], histogram[1], elapsed)
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+        if phase is not None:
+            _current.add_phase_time(phase, total)
+
+
+def branch(repo: str, branch_name: str) -> Dict[str, float]:
+    return _current.branch(repo, branch_name)
+
+
+def increment(name: str, amount: int = 1) -> None:
+    _current.increment(name, amount)
+
+
+def observe(name: str, label: str, seconds: float) -> None:
+    _current.observe(name, label, seconds)
+
+
+def record_request(url: str, status: Optional[int], nbytes: int, seconds: float) -> None:
+    _current.record_request(url, status, nbytes, seconds)
+
+
+def record_retry() -> None:
+    _current.record_retry()
+
+
+def write_summary(path: Path) -> None:
+    """Write the JSON run summary to ``path``."""
+    with Path(path).open("w", encoding="utf-8") as f:
+        json.dump(_current.summary(), f, indent=2, default=str)
+    logger.info("Run summary written to %s", path)
@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import local_git  # noqa: E402
+
+# Author dates (Unix seconds) of the fixture commits
+BASE_TS = 1767225600  # 2026-01-01
+STORY_TS = BASE_TS + 86400
+HOTFIX_TS = BASE_TS + 2 * 86400
+FEATURE_TS = BASE_TS + 3 * 86400
+
+
+def _git(repo, *args, ts=None):
+    env = dict(os.environ, GIT_CONFIG_GLOBAL=os.devnull, GIT_CONFIG_NOSYSTEM="1")
+    if ts is not None:
+        env["GIT_AUTHOR_DATE"] = env["GIT_COMMITTER_DATE"] = f"@{ts} +0000"
+    result = subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=dev", "-c", "user.email=dev@example.com", *args],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    return result.stdout.strip()
+
+
+def _commit(repo, message, ts):
+    _git(repo, "commit", "--allow-empty", "-q", "-m", message, ts=ts)
+    return _git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """develop: base, PCM-1, PCM-3; release (cut after PCM-1): PCM-2."""
+    path = tmp_path / "repo"
+    path.mkdir()
+    _git(path, "init", "-q", "-b", "develop")
+    ids = {"base": _commit(path, "Initial commit", BASE_TS)}
+    ids["PCM-1"] = _commit(path, "PCM-1: rating fix\n\nBody line one\nBody line two", STORY_TS)
+    _git(path, "branch", "release")
+    ids["PCM-3"] = _commit(path, "PCM-3 new feature", FEATURE_TS)
+    _git(path, "checkout", "-q", "release")
+    ids["PCM-2"] = _commit(path, "PCM-2 hotfix", HOTFIX_TS)
+    _git(path, "checkout", "-q", "develop")
+    return path, ids
+
+
+def _read(pages):
+    return [commit for page in pages for commit in page]
+
+
+def test_commit_pages_parse_ids_messages_and_timestamps(repo):
+    path, ids = repo
+    commits = _read(local_git.iter_commit_pages(path, "develop"))
+    assert [c["id"] for c in commits] == [ids["PCM-3"], ids["PCM-1"], ids["base"]]
+    assert [c["authorTimestamp"] for c in commits] == [FEATURE_TS * 1000, STORY_TS * 1000, BASE_TS * 1000]
+    assert commits[1]["message"] == "PCM-1: rating fix\n\nBody line one\nBody line two"
+
+
+def test_commit_pages_respect_page_size_and_window(repo):
+    path, ids = repo
+    pages = list(local_git.iter_commit_pages(path, "develop", page_size=2))
+    assert [len(page) for page in pages] == [2, 1]
+    window = _read(local_git.iter_commit_pages(
+        path, "develop",
+        start_date=datetime.fromtimestamp(STORY_TS), end_date=datetime.fromtimestamp(STORY_TS),
+    ))
+    assert [c["id"] for c in window] == [ids["PCM-1"]]
+
+
+def test_compare_pages_return_commits_only_on_from_branch(repo):
+    path, ids = repo
+    release_only = _read(local_git.iter_compare_pages(path, "release", "develop"))
+    develop_only = _read(local_git.iter_compare_pages(path, "develop", "release"))
+    assert [c["id"] for c in release_only] == [ids["PCM-2"]]
+    assert [c["id"] for c in develop_only] == [ids["PCM-3"]]
+
+
+def test_unknown_branch_raises(repo):
+    path, _ = repo
+    with pytest.raises(RuntimeError):
+        _read(local_git.iter_commit_pages(path, "no-such-branch"))
+
+
+def test_update_mirror_fetches_new_commits(repo, tmp_path):
+    path, _ = repo
+    mirror = tmp_path / "mirror.git"
+    _git(tmp_path, "clone", "-q", "--mirror", str(path), str(mirror))
+    new_id = _commit(path, "PCM-4 after the mirror was cloned", FEATURE_TS + 86400)
+    local_git.update_mirror(mirror)
+    commits = _read(local_git.iter_commit_pages(mirror, "develop"))
+    assert commits[0]["id"] == new_id
@@ -0,0 +1,96 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import http_client  # noqa: E402
+from resilience import (  # noqa: E402
+    DEFAULT_BACKOFF,
+    DEFAULT_BREAKER_COOLDOWN,
+    DEFAULT_BREAKER_THRESHOLD,
+    DEFAULT_RETRIES,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+HOST = "https://bitbucket.example.com"
+
+
+def _response(status):
+    response = requests.Response()
+    response.status_code = status
+    response._content = b""
+    return response
+
+
+class FakeSession:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        return _response(self.statuses.pop(0))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def install(statuses, **settings):
+        session = FakeSession(statuses)
+        monkeypatch.setattr(http_client, "get_session", lambda url: session)
+        http_client.configure(**settings)
+        return session
+
+    yield install
+    http_client.configure(
+        retries=DEFAULT_RETRIES,
+        backoff=DEFAULT_BACKOFF,
+        breaker_threshold=DEFAULT_BREAKER_THRESHOLD,
+        breaker_cooldown=DEFAULT_BREAKER_COOLDOWN,
+    )
+
+
+def test_breaker_blocks_until_cooldown():
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    breaker.record_failure(HOST)
+    breaker.before_request(HOST)
+    breaker.record_failure(HOST)
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_request(HOST)
+    assert 0 < excinfo.value.retry_in <= 60
+
+
+def test_neutral_trial_lets_the_next_request_through():
+    breaker = CircuitBreaker(threshold=1, cooldown=0)
+    breaker.record_failure(HOST)
+    breaker.before_request(HOST)  # the trial request
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request(HOST)
+    # The trial was throttled (429): neither a success nor a failure
+    breaker.record_neutral(HOST)
+    breaker.before_request(HOST)
+    breaker.record_success(HOST)
+    breaker.before_request(HOST)
+    breaker.before_request(HOST)
+
+
+def test_request_waits_for_open_breaker_and_survives_throttled_trial(client):
+    session = client([503, 429, 200], retries=3, backoff=0, breaker_threshold=1, breaker_cooldown=0.05)
+    started = time.monotonic()
+    response = http_client.get(f"{HOST}/rest/api/1.0/projects")
+    assert response.status_code == 200
+    assert session.calls == 3
+    # The second attempt waited out the cooldown instead of failing
+    assert time.monotonic() - started >= 0.05
+    http_client._breaker.before_request(HOST)
+
+
+def test_request_raises_when_breaker_stays_open(client):
+    session = client([503], retries=1, backoff=0, breaker_threshold=1, breaker_cooldown=60)
+    with pytest.raises(CircuitOpenError):
+        http_client.get(f"{HOST}/rest/api/1.0/projects")
+    assert session.calls == 1